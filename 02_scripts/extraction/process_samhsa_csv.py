@@ -3,124 +3,193 @@
 Process SAMHSA CSV directory and convert to standardized JSON format
 """
 
-import csv
-import json
 import os
+import sys
 from datetime import datetime
 from pathlib import Path
 
-def determine_level_of_care(row):
-    """Determine level of care based on facility characteristics"""
-    # Check for inpatient indicators
-    if (row.get('hi') == '1' or  # Hospital inpatient
-        row.get('hid') == '1' or  # Hospital inpatient detox
-        row.get('hit') == '1' or  # Hospital inpatient treatment
-        row.get('psyh') == '1' or  # Psychiatric hospital
-        row.get('vamc') == '1'):   # VA Medical Center
-        return 'inpatient'
-    
-    # Check for residential indicators  
-    elif (row.get('res') == '1' or  # Residential
-          row.get('rs') == '1' or   # Residential short-term
-          row.get('rl') == '1' or   # Residential long-term
-          row.get('rd') == '1'):    # Residential detox
-        return 'residential'
-    
-    # Default to outpatient for all others
-    else:
-        return 'outpatient'
+import numpy as np
+import orjson
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.csv as pacsv
+import pyarrow.parquet as pq
+from numba import njit
+from tqdm import tqdm
 
-def extract_services(row):
-    """Extract services from row data"""
-    services = []
-    
+# (column, label) pairs for each multi-valued field, in output order
+SERVICE_FLAGS = [
     # Substance abuse services
-    if row.get('sa') == '1':
-        services.append('Substance Abuse Treatment')
-    if row.get('dt') == '1':
-        services.append('Detoxification')
-    if row.get('mm') == '1':
-        services.append('Methadone Maintenance')
-    if row.get('otp') == '1':
-        services.append('Opioid Treatment Program')
-    if row.get('moa') == '1':
-        services.append('Medication-Assisted Treatment')
-    
+    ('sa', 'Substance Abuse Treatment'),
+    ('dt', 'Detoxification'),
+    ('mm', 'Methadone Maintenance'),
+    ('otp', 'Opioid Treatment Program'),
+    ('moa', 'Medication-Assisted Treatment'),
     # Mental health services
-    if row.get('mh') == '1':
-        services.append('Mental Health Treatment')
-    if row.get('psy') == '1':
-        services.append('Psychiatric Services')
-    
+    ('mh', 'Mental Health Treatment'),
+    ('psy', 'Psychiatric Services'),
     # Treatment modalities
-    if row.get('op') == '1':
-        services.append('Outpatient Treatment')
-    if row.get('res') == '1':
-        services.append('Residential Treatment')
-    if row.get('hi') == '1':
-        services.append('Hospital Inpatient')
-    if row.get('ph') == '1':
-        services.append('Partial Hospitalization')
-    
+    ('op', 'Outpatient Treatment'),
+    ('res', 'Residential Treatment'),
+    ('hi', 'Hospital Inpatient'),
+    ('ph', 'Partial Hospitalization'),
     # Specialized services
-    if row.get('cbt') == '1':
-        services.append('Cognitive Behavioral Therapy')
-    if row.get('dbt') == '1':
-        services.append('Dialectical Behavior Therapy')
-    if row.get('gt') == '1':
-        services.append('Group Therapy')
-    if row.get('cft') == '1':
-        services.append('Couples/Family Therapy')
-    
-    return services
+    ('cbt', 'Cognitive Behavioral Therapy'),
+    ('dbt', 'Dialectical Behavior Therapy'),
+    ('gt', 'Group Therapy'),
+    ('cft', 'Couples/Family Therapy'),
+]
+
+POPULATION_FLAGS = [
+    ('adlt', 'Adults'),
+    ('ped', 'Adolescents'),
+    ('yad', 'Young Adults'),
+    ('snr', 'Seniors'),
+    ('fem', 'Women'),
+    ('male', 'Men'),
+    ('vet', 'Veterans'),
+    ('cj', 'Criminal Justice Clients'),
+    ('dv', 'Domestic Violence'),
+    ('tay', 'Transition Age Youth'),
+]
+
+INSURANCE_FLAGS = [
+    ('pi', 'Private Insurance'),
+    ('mc', 'Medicaid'),
+    ('md', 'Medicare'),
+    ('si', 'State Insurance'),
+    ('mi', 'Military Insurance'),
+    ('sf', 'Sliding Fee Scale'),
+    ('pa', 'Payment Assistance'),
+]
+
+# Service columns echoed into each record's raw_data, in unpacking order
+RAW_DATA_COLUMNS = ['mh', 'sa', 'dt', 'mm', 'otp']
+
+LEVELS = ['outpatient', 'residential', 'inpatient']
 
-def extract_populations_served(row):
-    """Extract populations served from row data"""
-    populations = []
+# Facility ID prefix for each level of care
+LEVEL_PREFIX = {
+    'outpatient': 'SAMHSA_OUT',
+    'residential': 'SAMHSA_RES',
+    'inpatient': 'SAMHSA_INP'
+}
+
+# Indicator columns used by determine_levels_of_care
+INPATIENT_FLAGS = [
+    ('hi', 'Hospital inpatient'),
+    ('hid', 'Hospital inpatient detox'),
+    ('hit', 'Hospital inpatient treatment'),
+    ('psyh', 'Psychiatric hospital'),
+    ('vamc', 'VA Medical Center'),
+]
+
+RESIDENTIAL_FLAGS = [
+    ('res', 'Residential'),
+    ('rs', 'Residential short-term'),
+    ('rl', 'Residential long-term'),
+    ('rd', 'Residential detox'),
+]
+
+# Free-text columns copied into the facility record
+TEXT_COLUMNS = [
+    'name1', 'name2', 'street1', 'street2', 'city', 'state', 'zip', 'county',
+    'phone', 'intake1', 'website', 'latitude', 'longitude', 'type_facility'
+]
+
+def read_facility_csv(csv_path):
+    """Read the columns we use from the SAMHSA CSV as strings, with '' for missing values"""
+    columns = list(dict.fromkeys(
+        TEXT_COLUMNS +
+        [code for code, _ in INPATIENT_FLAGS + RESIDENTIAL_FLAGS + SERVICE_FLAGS +
+         POPULATION_FLAGS + INSURANCE_FLAGS]
+    ))
+    table = pacsv.read_csv(
+        csv_path,
+        # Quoted fields may span lines, as csv.DictReader allowed
+        parse_options=pacsv.ParseOptions(newlines_in_values=True),
+        convert_options=pacsv.ConvertOptions(
+            include_columns=columns,
+            include_missing_columns=True,
+            column_types={column: pa.string() for column in columns}
+        )
+    )
+    return pa.table({column: pc.fill_null(table.column(column), '') for column in columns})
+
+def flag_matrix(table, flags):
+    """Build a uint8 matrix with one column per flag, 1 where the CSV value is '1'"""
+    matrix = np.empty((table.num_rows, len(flags)), dtype=np.uint8)
+    for j, (code, _) in enumerate(flags):
+        matrix[:, j] = table.column(code).to_numpy(zero_copy_only=False) == '1'
+    return matrix
+
+def determine_levels_of_care(table):
+    """Determine level of care for every row based on facility characteristics"""
+    # Any inpatient indicator wins, then any residential one, else outpatient
+    inpatient = flag_matrix(table, INPATIENT_FLAGS).any(axis=1)
+    residential = flag_matrix(table, RESIDENTIAL_FLAGS).any(axis=1)
+    levels = np.where(inpatient, 'inpatient', np.where(residential, 'residential', 'outpatient'))
+    return levels.tolist()
+
+@njit(cache=True)
+def build_flag_indices(flags):
+    """Return CSR (indptr, indices) listing the set flag columns of each row"""
+    n_rows, n_cols = flags.shape
+    indptr = np.zeros(n_rows + 1, dtype=np.int64)
+    for i in range(n_rows):
+        count = 0
+        for j in range(n_cols):
+            count += flags[i, j]
+        indptr[i + 1] = indptr[i] + count
     
-    if row.get('adlt') == '1':
-        populations.append('Adults')
-    if row.get('ped') == '1':
-        populations.append('Adolescents')
-    if row.get('yad') == '1':
-        populations.append('Young Adults')
-    if row.get('snr') == '1':
-        populations.append('Seniors')
-    if row.get('fem') == '1':
-        populations.append('Women')
-    if row.get('male') == '1':
-        populations.append('Men')
-    if row.get('vet') == '1':
-        populations.append('Veterans')
-    if row.get('cj') == '1':
-        populations.append('Criminal Justice Clients')
-    if row.get('dv') == '1':
-        populations.append('Domestic Violence')
-    if row.get('tay') == '1':
-        populations.append('Transition Age Youth')
-        
-    return populations
+    indices = np.empty(indptr[n_rows], dtype=np.int64)
+    k = 0
+    for i in range(n_rows):
+        for j in range(n_cols):
+            if flags[i, j]:
+                indices[k] = j
+                k += 1
+    
+    return indptr, indices
+
+def expand_labels(flags, table):
+    """Turn a flag matrix into one label list per row"""
+    labels = [label for _, label in table]
+    indptr, indices = build_flag_indices(flags)
+    indptr = indptr.tolist()
+    indices = indices.tolist()
+    return [[labels[j] for j in indices[indptr[i]:indptr[i + 1]]] for i in range(len(indptr) - 1)]
+
+def joined_column(table, first, second, separator):
+    """Strip two text columns and append the second to the first when present"""
+    first = pc.utf8_trim_whitespace(table.column(first))
+    second = pc.utf8_trim_whitespace(table.column(second))
+    joined = pc.binary_join_element_wise(first, second, separator)
+    return pc.if_else(pc.not_equal(second, ''), joined, first)
 
-def extract_insurance_accepted(row):
-    """Extract insurance types accepted"""
-    insurance = []
+def facility_keys(names, addresses, cities):
+    """Dedup key per row: 'name|address|city' lowercased with str.lower"""
+    return [f"{name.lower()}|{address.lower()}|{city.lower()}"
+            for name, address, city in zip(names, addresses, cities)]
+
+def count_by_level_and_state(levels, states):
+    """Tally facilities per level of care and per state/level in one NumPy pass"""
+    level_names, level_idx = np.unique(np.array(levels, dtype=str), return_inverse=True)
+    state_names, state_idx = np.unique(np.array(states, dtype=str), return_inverse=True)
+    counts = np.zeros((len(state_names), len(level_names)), dtype=np.int64)
+    np.add.at(counts, (state_idx, level_idx), 1)
     
-    if row.get('pi') == '1':
-        insurance.append('Private Insurance')
-    if row.get('mc') == '1':
-        insurance.append('Medicaid')
-    if row.get('md') == '1':
-        insurance.append('Medicare')
-    if row.get('si') == '1':
-        insurance.append('State Insurance')
-    if row.get('mi') == '1':
-        insurance.append('Military Insurance')
-    if row.get('sf') == '1':
-        insurance.append('Sliding Fee Scale')
-    if row.get('pa') == '1':
-        insurance.append('Payment Assistance')
-        
-    return insurance
+    level_names = level_names.tolist()
+    by_level = dict.fromkeys(LEVELS, 0)
+    by_level.update(zip(level_names, counts.sum(axis=0).tolist()))
+    
+    by_state = {}
+    for state, row in zip(state_names.tolist(), counts.tolist()):
+        state_counts = {'total': sum(row), **dict.fromkeys(LEVELS, 0)}
+        state_counts.update(zip(level_names, row))
+        by_state[state] = state_counts
+    
+    return by_level, by_state
 
 def process_samhsa_csv():
     """Process SAMHSA CSV file and convert to standardized format"""
@@ -133,108 +202,129 @@ def process_samhsa_csv():
     
     print(f"Processing SAMHSA CSV: {csv_path}")
     
-    # Statistics tracking
+    # Statistics tracking; level/state counts are filled in after the row loop
     stats = {
         'total_facilities': 0,
-        'by_level': {'outpatient': 0, 'residential': 0, 'inpatient': 0},
+        'by_level': {},
         'by_state': {},
         'duplicates_found': 0
     }
     
-    facilities = []
     seen_facilities = set()  # Track duplicates by name + address
+    kept_states = []
+    kept_levels = []
+    
+    table = read_facility_csv(csv_path)
+    
+    # One slot per CSV row; trimmed to the kept facilities after the loop
+    facilities = [None] * table.num_rows
+    facility_count = 0
+    
+    levels = determine_levels_of_care(table)
+    
+    # Label lists for every row, computed in one pass over the flag matrices
+    service_flags = flag_matrix(table, SERVICE_FLAGS)
+    services = expand_labels(service_flags, SERVICE_FLAGS)
+    populations = expand_labels(flag_matrix(table, POPULATION_FLAGS), POPULATION_FLAGS)
+    insurance = expand_labels(flag_matrix(table, INSURANCE_FLAGS), INSURANCE_FLAGS)
+    
+    # raw_data reuses the service flags instead of re-testing the row strings
+    service_columns = [code for code, _ in SERVICE_FLAGS]
+    raw_flags = service_flags[:, [service_columns.index(code) for code in RAW_DATA_COLUMNS]]
+    raw_flags = raw_flags.astype(bool).tolist()
+    
+    # Only keep websites that are full URLs
+    websites = pc.utf8_trim_whitespace(table.column('website'))
+    websites = pc.if_else(pc.starts_with(websites, 'http'), websites, '').to_pylist()
+    
+    # Cleaned name/address/city columns and their dedup keys
+    names = joined_column(table, 'name1', 'name2', ' - ').to_pylist()
+    addresses = joined_column(table, 'street1', 'street2', ', ').to_pylist()
+    cities = pc.utf8_trim_whitespace(table.column('city')).to_pylist()
+    keys = facility_keys(names, addresses, cities)
+    states = pc.utf8_trim_whitespace(table.column('state')).to_pylist()
     
-    with open(csv_path, 'r', encoding='utf-8') as csvfile:
-        reader = csv.DictReader(csvfile)
+    # Remaining per-row fields, pulled as column lists like the ones above
+    zip_codes = pc.utf8_trim_whitespace(table.column('zip')).to_pylist()
+    phones = pc.utf8_trim_whitespace(table.column('phone')).to_pylist()
+    intake_phones = pc.utf8_trim_whitespace(table.column('intake1')).to_pylist()
+    counties = table.column('county').to_pylist()
+    latitudes = table.column('latitude').to_pylist()
+    longitudes = table.column('longitude').to_pylist()
+    facility_types = table.column('type_facility').to_pylist()
+    
+    for i in tqdm(range(table.num_rows), desc="Processing rows", unit="rows"):
+        # Skip if missing essential data, before extracting anything else
+        name = names[i]
+        state = states[i]
+        if not name or not state:
+            continue
         
-        for row_num, row in enumerate(reader, 1):
-            if row_num % 1000 == 0:
-                print(f"Processed {row_num} rows...")
-            
-            # Clean and extract basic info
-            name = row.get('name1', '').strip()
-            name2 = row.get('name2', '').strip()
-            if name2:
-                name = f"{name} - {name2}"
-            
-            address = row.get('street1', '').strip()
-            address2 = row.get('street2', '').strip()
-            if address2:
-                address = f"{address}, {address2}"
-                
-            city = row.get('city', '').strip()
-            state = row.get('state', '').strip()
-            zip_code = row.get('zip', '').strip()
-            phone = row.get('phone', '').strip()
-            website = row.get('website', '').strip()
-            
-            # Skip if missing essential data
-            if not name or not state:
-                continue
-            
-            # Check for duplicates
-            facility_key = f"{name.lower()}|{address.lower()}|{city.lower()}"
-            if facility_key in seen_facilities:
-                stats['duplicates_found'] += 1
-                continue
-            seen_facilities.add(facility_key)
-            
-            # Determine level of care
-            level = determine_level_of_care(row)
-            
-            # Generate unique ID
-            level_prefix = {
-                'outpatient': 'SAMHSA_OUT',
-                'residential': 'SAMHSA_RES', 
-                'inpatient': 'SAMHSA_INP'
-            }
-            facility_id = f"{level_prefix[level]}_{len(facilities) + 1:06d}"
-            
-            # Build standardized facility record
-            facility = {
-                'id': facility_id,
-                'name': name,
-                'level_of_care': level,
-                'facility_type': row.get('type_facility', ''),
-                'address': {
-                    'street': address,
-                    'city': city,
-                    'state': state,
-                    'zip': zip_code,
-                    'county': row.get('county', '')
-                },
-                'contact': {
-                    'phone': phone,
-                    'website': website if website.startswith('http') else '',
-                    'intake_phone': row.get('intake1', '').strip()
-                },
-                'location': {
-                    'latitude': row.get('latitude', ''),
-                    'longitude': row.get('longitude', '')
-                },
-                'services': extract_services(row),
-                'populations_served': extract_populations_served(row),
-                'insurance_accepted': extract_insurance_accepted(row),
-                'data_source': 'SAMHSA Treatment Locator',
-                'extraction_date': datetime.now().strftime('%Y-%m-%d'),
-                'raw_data': {
-                    'mh_services': row.get('mh') == '1',
-                    'sa_services': row.get('sa') == '1',
-                    'detox': row.get('dt') == '1',
-                    'methadone': row.get('mm') == '1',
-                    'otp': row.get('otp') == '1'
-                }
+        # Check for duplicates
+        facility_key = keys[i]
+        if facility_key in seen_facilities:
+            stats['duplicates_found'] += 1
+            continue
+        seen_facilities.add(facility_key)
+        
+        address = addresses[i]
+        city = cities[i]
+        state = sys.intern(state)
+        zip_code = zip_codes[i]
+        phone = phones[i]
+        website = websites[i]
+        
+        level = levels[i]
+        
+        mh, sa, dt, mm, otp = raw_flags[i]
+        
+        # Generate unique ID
+        facility_id = f"{LEVEL_PREFIX[level]}_{facility_count + 1:06d}"
+        
+        # Build standardized facility record
+        facility = {
+            'id': facility_id,
+            'name': name,
+            'level_of_care': level,
+            'facility_type': facility_types[i],
+            'address': {
+                'street': address,
+                'city': city,
+                'state': state,
+                'zip': zip_code,
+                'county': counties[i]
+            },
+            'contact': {
+                'phone': phone,
+                'website': website,
+                'intake_phone': intake_phones[i]
+            },
+            'location': {
+                'latitude': latitudes[i],
+                'longitude': longitudes[i]
+            },
+            'services': services[i],
+            'populations_served': populations[i],
+            'insurance_accepted': insurance[i],
+            'data_source': 'SAMHSA Treatment Locator',
+            'extraction_date': datetime.now().strftime('%Y-%m-%d'),
+            'raw_data': {
+                'mh_services': mh,
+                'sa_services': sa,
+                'detox': dt,
+                'methadone': mm,
+                'otp': otp
             }
-            
-            facilities.append(facility)
-            stats['total_facilities'] += 1
-            stats['by_level'][level] += 1
-            
-            # Update state counts
-            if state not in stats['by_state']:
-                stats['by_state'][state] = {'total': 0, 'outpatient': 0, 'residential': 0, 'inpatient': 0}
-            stats['by_state'][state]['total'] += 1
-            stats['by_state'][state][level] += 1
+        }
+        
+        facilities[facility_count] = facility
+        facility_count += 1
+        kept_states.append(state)
+        kept_levels.append(level)
+    
+    del facilities[facility_count:]
+    stats['total_facilities'] = facility_count
+    stats['by_level'], stats['by_state'] = count_by_level_and_state(kept_levels, kept_states)
     
     # Save processed data
     output_data = {
@@ -251,8 +341,14 @@ def process_samhsa_csv():
     
     # Save to processed data directory
     output_path = base_path / "03_raw_data" / "samhsa_facilities_processed.json"
-    with open(output_path, 'w') as f:
-        json.dump(output_data, f, indent=2)
+    with open(output_path, 'wb', buffering=1 << 20) as f:
+        f.write(orjson.dumps(output_data, option=orjson.OPT_INDENT_2))
+    
+    # Columnar sidecar: dictionary-encoded states/levels and list-typed
+    # services, for consumers that only need a few fields
+    parquet_path = output_path.with_suffix('.parquet')
+    pq.write_table(pa.Table.from_pylist(facilities), parquet_path,
+                   compression='zstd', use_dictionary=True)
     
     print(f"\n{'='*60}")
     print(f"SAMHSA CSV PROCESSING COMPLETE")
@@ -272,6 +368,7 @@ def process_samhsa_csv():
         print(f"  - {state}: {counts['total']:,} facilities")
     
     print(f"\nSaved to: {output_path}")
+    print(f"Parquet copy: {parquet_path}")
     
     return output_data
 
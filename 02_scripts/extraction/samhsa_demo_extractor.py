@@ -13,14 +13,24 @@ Author: Claude Code
 Date: 2025-07-31
 """
 
-import json
-import pandas as pd
+from __future__ import annotations
+
+import numpy as np
+import orjson
+import zstandard
 import logging
-from typing import Dict, List, Optional, Any
-from dataclasses import dataclass, asdict
+from typing import Dict, List, NamedTuple, Optional, Union, Any
+from dataclasses import dataclass, fields
 import os
 from datetime import datetime
-import random
+from operator import attrgetter
+from types import MappingProxyType
+from enum import IntFlag
+import sys
+import gzip
+import itertools
+from concurrent.futures import ProcessPoolExecutor
+from tqdm import tqdm
 
 # Configure logging
 logging.basicConfig(
@@ -33,7 +43,42 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
-@dataclass
+class ServiceFlag(IntFlag):
+    """Outpatient service offerings packed into OutpatientFacility.service_flags."""
+    
+    # Outpatient Service Types
+    STANDARD_OUTPATIENT = 1 << 0
+    INTENSIVE_OUTPATIENT = 1 << 1
+    PARTIAL_HOSPITALIZATION = 1 << 2
+    DAY_TREATMENT = 1 << 3
+    
+    # Specialized Outpatient Services
+    MEDICATION_ASSISTED_TREATMENT = 1 << 4
+    OPIOID_TREATMENT_PROGRAM = 1 << 5
+    OFFICE_BASED_OPIOID_TREATMENT = 1 << 6
+    METHADONE_MAINTENANCE = 1 << 7
+    BUPRENORPHINE_TREATMENT = 1 << 8
+    NALTREXONE_TREATMENT = 1 << 9
+    
+    # Additional Programs
+    DUI_DWI_PROGRAMS = 1 << 10
+    ADOLESCENT_PROGRAMS = 1 << 11
+    WOMEN_ONLY_PROGRAMS = 1 << 12
+    MEN_ONLY_PROGRAMS = 1 << 13
+
+# Services that make a facility count as outpatient in filter_outpatient_only
+OUTPATIENT_SERVICES = (
+    ServiceFlag.STANDARD_OUTPATIENT
+    | ServiceFlag.INTENSIVE_OUTPATIENT
+    | ServiceFlag.PARTIAL_HOSPITALIZATION
+    | ServiceFlag.DAY_TREATMENT
+    | ServiceFlag.MEDICATION_ASSISTED_TREATMENT
+    | ServiceFlag.OPIOID_TREATMENT_PROGRAM
+    | ServiceFlag.OFFICE_BASED_OPIOID_TREATMENT
+    | ServiceFlag.DUI_DWI_PROGRAMS
+)
+
+@dataclass(slots=True)
 class OutpatientFacility:
     """Comprehensive data structure for outpatient treatment facilities."""
     
@@ -64,25 +109,10 @@ class OutpatientFacility:
     federal_certification: str = ""
     accreditations: List[str] = None
     
-    # Outpatient Service Types
-    standard_outpatient: bool = False
-    intensive_outpatient: bool = False
-    partial_hospitalization: bool = False
-    day_treatment: bool = False
-    
-    # Specialized Outpatient Services
-    medication_assisted_treatment: bool = False
-    opioid_treatment_program: bool = False
-    office_based_opioid_treatment: bool = False
-    methadone_maintenance: bool = False
-    buprenorphine_treatment: bool = False
-    naltrexone_treatment: bool = False
-    
-    # Additional Programs
-    dui_dwi_programs: bool = False
-    adolescent_programs: bool = False
-    women_only_programs: bool = False
-    men_only_programs: bool = False
+    # Outpatient Service Types, Specialized Outpatient Services and
+    # Additional Programs, packed as ServiceFlag bits. Each flag is also
+    # exposed as a bool property (standard_outpatient, ...).
+    service_flags: int = 0
     
     # Treatment Modalities
     individual_therapy: bool = False
@@ -173,11 +203,134 @@ class OutpatientFacility:
         if self.extraction_date == "":
             self.extraction_date = datetime.now().isoformat()
 
+def _service_flag_property(flag: ServiceFlag) -> property:
+    """Bool view of one ServiceFlag bit of OutpatientFacility.service_flags."""
+    # Plain int bit so the bitwise ops stay in C instead of IntFlag.__and__
+    bit = int(flag)
+    
+    def getter(self) -> bool:
+        return bool(self.service_flags & bit)
+    
+    def setter(self, value: bool):
+        if value:
+            self.service_flags |= bit
+        else:
+            self.service_flags &= ~bit
+    
+    return property(getter, setter)
+
+for _flag in ServiceFlag:
+    setattr(OutpatientFacility, _flag.name.lower(), _service_flag_property(_flag))
+
+# Record keys in declaration order, for building records without asdict();
+# service_flags is written out as its individual bool fields
+FACILITY_FIELD_NAMES = tuple(itertools.chain.from_iterable(
+    [flag.name.lower() for flag in ServiceFlag] if field.name == "service_flags" else [field.name]
+    for field in fields(OutpatientFacility)
+))
+
+class FacilityInfo(NamedTuple):
+    """Basic information a sample facility is generated from."""
+    name: str
+    city: str
+    state: str
+    services: List[str]
+
+# Sample weekly hours, shared by every generated facility. Read-only so that
+# mutating one facility's hours cannot leak into the others.
+HOURS_SATURDAY_OPEN = MappingProxyType({
+    "monday": "8:00 AM - 5:00 PM",
+    "tuesday": "8:00 AM - 5:00 PM",
+    "wednesday": "8:00 AM - 5:00 PM",
+    "thursday": "8:00 AM - 5:00 PM",
+    "friday": "8:00 AM - 5:00 PM",
+    "saturday": "9:00 AM - 2:00 PM",
+    "sunday": "Closed"
+})
+HOURS_SATURDAY_CLOSED = MappingProxyType({**HOURS_SATURDAY_OPEN, "saturday": "Closed"})
+
+# Static parts of the output header; extraction_date and total_facilities
+# are filled in per run by build_output_metadata
+_METADATA_TEMPLATE = MappingProxyType({
+    "extraction_date": None,
+    "extraction_type": "Comprehensive Demo Dataset",
+    "data_source": "SAMHSA N-SUMHSS (Simulated)",
+    "survey_year": 2023,
+    "total_facilities": 0,
+    "extraction_method": "Demo/Simulation",
+    "target_service_types": (
+        "Standard Outpatient (OP)",
+        "Intensive Outpatient (IOP)",
+        "Partial Hospitalization (PHP/Day Treatment)",
+        "Medication-Assisted Treatment (MAT) clinics",
+        "Opioid Treatment Programs (OTP/Methadone clinics)",
+        "Office-based opioid treatment (OBOT)",
+        "DUI/DWI programs",
+        "Adolescent outpatient programs"
+    ),
+    "geographic_coverage": "All US States and Territories",
+    "data_completeness": "Comprehensive - All Fields Populated",
+    "quality_notes": (
+        "This is demonstration data showing the structure and format",
+        "Real SAMHSA data would be extracted from N-SUMHSS dataset",
+        "All facility information is simulated for demo purposes"
+    )
+})
+
+_FIELD_DEFINITIONS = MappingProxyType({
+    "facility_name": "Official name of the treatment facility",
+    "facility_id": "Unique identifier from SAMHSA database",
+    "standard_outpatient": "Offers standard outpatient treatment services",
+    "intensive_outpatient": "Offers intensive outpatient program (IOP)",
+    "partial_hospitalization": "Offers partial hospitalization/day treatment",
+    "medication_assisted_treatment": "Provides medication-assisted treatment",
+    "opioid_treatment_program": "Licensed opioid treatment program",
+    "serves_adolescents": "Provides services to adolescent populations",
+    "accepts_medicaid": "Accepts Medicaid insurance",
+    "sliding_fee_scale": "Offers sliding fee scale based on income"
+})
+
+def dump_facility(facility: OutpatientFacility) -> bytes:
+    """Serialize one facility as a compact JSON object."""
+    record = {name: getattr(facility, name) for name in FACILITY_FIELD_NAMES}
+    return orjson.dumps(record, default=dict, option=orjson.OPT_SERIALIZE_NUMPY)
+
+def open_output(filepath: str):
+    """Open an output file for binary writing, compressing by .gz/.zst suffix."""
+    if filepath.endswith(".gz"):
+        return gzip.open(filepath, 'wb', compresslevel=1)
+    if filepath.endswith(".zst"):
+        return zstandard.open(filepath, 'wb', cctx=zstandard.ZstdCompressor(level=1))
+    return open(filepath, 'wb')
+
+def ndjson_meta_path(filepath: str) -> str:
+    """Path of the metadata file that accompanies a JSON Lines output file."""
+    for suffix in (".gz", ".zst"):
+        if filepath.endswith(suffix):
+            filepath = filepath[:-len(suffix)]
+    return os.path.splitext(filepath)[0] + ".meta.json"
+
+def flag_matrix(facilities: List[OutpatientFacility], field_names: List[str]) -> np.ndarray:
+    """Return a uint8 matrix with one row per facility and one column per boolean field."""
+    values = list(map(attrgetter(*field_names), facilities))
+    return np.array(values, dtype=np.uint8).reshape(len(facilities), len(field_names))
+
+def value_counts(facilities: List[OutpatientFacility], field_name: str) -> Dict[str, int]:
+    """Count facilities per distinct value of a string field."""
+    values = np.array(list(map(attrgetter(field_name), facilities)), dtype=str)
+    unique_values, counts = np.unique(values, return_counts=True)
+    return dict(zip(unique_values.tolist(), counts.tolist()))
+
 class SAMHSADemoExtractor:
     """Demo class for SAMHSA outpatient treatment facility extraction."""
     
-    def __init__(self):
-        """Initialize the demo extractor."""
+    def __init__(self, seed: Optional[Union[int, np.random.SeedSequence]] = None):
+        """
+        Initialize the demo extractor.
+        
+        Args:
+            seed: Optional seed (or SeedSequence) for reproducible sample data
+        """
         self.facilities = []
         self.extracted_count = 0
         
@@ -235,6 +388,9 @@ class SAMHSADemoExtractor:
             }
         ]
         
+        # Name suffixes used for variations of each template
+        self.name_suffixes = ["II", "North", "South", "East", "West", "Center", "Associates", "Services"]
+        
         # Service type mappings
         self.service_mappings = {
             "standard_outpatient": "standard_outpatient",
@@ -255,46 +411,101 @@ class SAMHSADemoExtractor:
             "criminal_justice": "serves_criminal_justice",
             "lgbtq_services": "serves_lgbtq"
         }
+        
+        # Random number generator and choice tables for batch sampling
+        if not isinstance(seed, np.random.SeedSequence):
+            seed = np.random.SeedSequence(seed)
+        self._seed_sequence = seed
+        
+        # One extraction timestamp shared by every facility of a run
+        self._extraction_ts = datetime.now().isoformat()
+        self._rng = np.random.default_rng(seed)
+        self._street_names = np.array(['Main', 'Oak', 'Pine', 'Cedar', 'Elm'])
+        self._street_types = np.array(['St', 'Ave', 'Blvd', 'Dr'])
+        self._ownership_types = np.array(["Private Non-Profit", "Private For-Profit", "Public"])
+        
+        # Geographic coordinates (approximate for demo)
+        state_coords = {
+            "CA": (34.0522, -118.2437), "AZ": (33.4484, -112.0740),
+            "NY": (40.7128, -74.0060), "FL": (25.7617, -80.1918),
+            "CO": (39.7392, -104.9903), "WA": (47.6062, -122.3321),
+            "IL": (41.8781, -87.6298), "TX": (29.7604, -95.3698),
+            "MA": (42.3601, -71.0589), "NV": (36.1699, -115.1398)
+        }
+        self._state_index = {state: i for i, state in enumerate(state_coords)}
+        self._state_lat = np.array([lat for lat, _ in state_coords.values()])
+        self._state_lng = np.array([lng for _, lng in state_coords.values()])
     
-    def generate_sample_facility(self, facility_info: Dict) -> OutpatientFacility:
+    def _draw_batch(self, n: int) -> Dict[str, np.ndarray]:
         """
-        Generate a realistic sample facility with comprehensive data.
+        Draw every random attribute for a batch of facilities at once.
+        
+        Args:
+            n: Number of facilities in the batch
+            
+        Returns:
+            Dictionary mapping attribute name to an array with one value per facility
+        """
+        rng = self._rng
+        outpatient_capacity = rng.integers(50, 500, size=n, endpoint=True)
+        
+        return {
+            "facility_id": rng.integers(10000, 99999, size=n, endpoint=True),
+            "street_number": rng.integers(100, 9999, size=n, endpoint=True),
+            "street_name": rng.choice(self._street_names, size=n),
+            "street_type": rng.choice(self._street_types, size=n),
+            "zip_code": rng.integers(10000, 99999, size=n, endpoint=True),
+            "area_code": rng.integers(200, 999, size=n, endpoint=True),
+            "exchange": rng.integers(200, 999, size=n, endpoint=True),
+            "line_number": rng.integers(1000, 9999, size=n, endpoint=True),
+            "latitude_offset": rng.uniform(-0.5, 0.5, size=n),
+            "longitude_offset": rng.uniform(-0.5, 0.5, size=n),
+            "state_license": rng.integers(1000, 9999, size=n, endpoint=True),
+            "federal_certification": rng.integers(100000, 999999, size=n, endpoint=True),
+            "accepts_medicaid": rng.random(n) < 0.5,
+            "accepts_medicare": rng.random(n) < 0.5,
+            "walk_ins_accepted": rng.random(n) < 0.5,
+            "saturday_open": rng.random(n) < 0.5,
+            "total_staff_count": rng.integers(5, 50, size=n, endpoint=True),
+            "licensed_physicians": rng.integers(1, 5, size=n, endpoint=True),
+            "licensed_counselors": rng.integers(2, 15, size=n, endpoint=True),
+            "social_workers": rng.integers(1, 8, size=n, endpoint=True),
+            "ownership_type": rng.choice(self._ownership_types, size=n),
+            "outpatient_capacity": outpatient_capacity,
+            "current_outpatient_census": rng.integers(20, outpatient_capacity, endpoint=True),
+        }
+    
+    def _build_facility(self, facility_info: FacilityInfo, draws: Dict[str, List], i: int) -> OutpatientFacility:
+        """
+        Assemble one facility from its basic information and row i of a batch of draws.
         
         Args:
             facility_info: Basic facility information
+            draws: Batch draws converted to Python lists
+            i: Index of this facility within the batch
             
         Returns:
             OutpatientFacility object with sample data
         """
-        facility = OutpatientFacility()
+        facility = OutpatientFacility(extraction_date=self._extraction_ts)
         
         # Basic Information
-        facility.facility_name = facility_info["name"]
-        facility.facility_id = f"SAMHSA-{random.randint(10000, 99999)}"
+        facility.facility_name = facility_info.name
+        facility.facility_id = f"SAMHSA-{draws['facility_id'][i]}"
         
         # Address
-        facility.city = facility_info["city"]
-        facility.state = facility_info["state"]
-        facility.address_line1 = f"{random.randint(100, 9999)} {random.choice(['Main', 'Oak', 'Pine', 'Cedar', 'Elm'])} {random.choice(['St', 'Ave', 'Blvd', 'Dr'])}"
-        facility.zip_code = f"{random.randint(10000, 99999)}"
-        facility.phone = f"({random.randint(200, 999)}) {random.randint(200, 999)}-{random.randint(1000, 9999)}"
-        
-        # Geographic coordinates (approximate for demo)
-        state_coords = {
-            "CA": (34.0522, -118.2437), "AZ": (33.4484, -112.0740),
-            "NY": (40.7128, -74.0060), "FL": (25.7617, -80.1918),
-            "CO": (39.7392, -104.9903), "WA": (47.6062, -122.3321),
-            "IL": (41.8781, -87.6298), "TX": (29.7604, -95.3698),
-            "MA": (42.3601, -71.0589), "NV": (36.1699, -115.1398)
-        }
+        facility.city = facility_info.city
+        facility.state = sys.intern(facility_info.state)
+        facility.address_line1 = f"{draws['street_number'][i]} {draws['street_name'][i]} {draws['street_type'][i]}"
+        facility.zip_code = f"{draws['zip_code'][i]}"
+        facility.phone = f"({draws['area_code'][i]}) {draws['exchange'][i]}-{draws['line_number'][i]}"
         
-        if facility.state in state_coords:
-            lat, lng = state_coords[facility.state]
-            facility.latitude = lat + random.uniform(-0.5, 0.5)
-            facility.longitude = lng + random.uniform(-0.5, 0.5)
+        # Geographic coordinates
+        facility.latitude = draws["latitude"][i]
+        facility.longitude = draws["longitude"][i]
         
         # Services based on facility info
-        services = facility_info.get("services", [])
+        services = facility_info.services
         for service in services:
             if service in self.service_mappings:
                 attr_name = self.service_mappings[service]
@@ -302,9 +513,9 @@ class SAMHSADemoExtractor:
                     setattr(facility, attr_name, True)
         
         # License and certification
-        facility.state_license = f"{facility.state}-{random.randint(1000, 9999)}"
+        facility.state_license = f"{facility.state}-{draws['state_license'][i]}"
         if facility.opioid_treatment_program:
-            facility.federal_certification = f"DEA-{random.randint(100000, 999999)}"
+            facility.federal_certification = f"DEA-{draws['federal_certification'][i]}"
         
         # Age groups and populations
         facility.serves_adults = True
@@ -316,40 +527,32 @@ class SAMHSADemoExtractor:
         facility.maximum_age = 99
         
         # Insurance and payment
-        facility.accepts_medicaid = random.choice([True, False])
-        facility.accepts_medicare = random.choice([True, False])
+        facility.accepts_medicaid = draws["accepts_medicaid"][i]
+        facility.accepts_medicare = draws["accepts_medicare"][i]
         facility.accepts_private_insurance = True
         facility.accepts_cash_self_payment = True
         facility.sliding_fee_scale = "sliding_scale" in services
         
         # Operational details
         facility.appointment_required = True
-        facility.walk_ins_accepted = random.choice([True, False])
+        facility.walk_ins_accepted = draws["walk_ins_accepted"][i]
         facility.telehealth_services = "telehealth" in services
         
-        # Sample hours
-        facility.hours_of_operation = {
-            "monday": "8:00 AM - 5:00 PM",
-            "tuesday": "8:00 AM - 5:00 PM",
-            "wednesday": "8:00 AM - 5:00 PM",
-            "thursday": "8:00 AM - 5:00 PM",
-            "friday": "8:00 AM - 5:00 PM",
-            "saturday": "9:00 AM - 2:00 PM" if random.choice([True, False]) else "Closed",
-            "sunday": "Closed"
-        }
+        # Sample hours (shared read-only mappings)
+        facility.hours_of_operation = HOURS_SATURDAY_OPEN if draws["saturday_open"][i] else HOURS_SATURDAY_CLOSED
         
         # Staff information
-        facility.total_staff_count = random.randint(5, 50)
-        facility.licensed_physicians = random.randint(1, 5) if facility.medication_assisted_treatment else 0
-        facility.licensed_counselors = random.randint(2, 15)
-        facility.social_workers = random.randint(1, 8)
+        facility.total_staff_count = draws["total_staff_count"][i]
+        facility.licensed_physicians = draws["licensed_physicians"][i] if facility.medication_assisted_treatment else 0
+        facility.licensed_counselors = draws["licensed_counselors"][i]
+        facility.social_workers = draws["social_workers"][i]
         
         # Facility characteristics
-        facility.ownership_type = random.choice(["Private Non-Profit", "Private For-Profit", "Public"])
+        facility.ownership_type = draws["ownership_type"][i]
         
         # Capacity
-        facility.outpatient_capacity = random.randint(50, 500)
-        facility.current_outpatient_census = random.randint(20, facility.outpatient_capacity)
+        facility.outpatient_capacity = draws["outpatient_capacity"][i]
+        facility.current_outpatient_census = draws["current_outpatient_census"][i]
         facility.waitlist_exists = facility.current_outpatient_census >= facility.outpatient_capacity * 0.9
         
         # Metadata
@@ -358,49 +561,98 @@ class SAMHSADemoExtractor:
         
         return facility
     
-    def create_comprehensive_sample_data(self, target_count: int = 2000) -> List[OutpatientFacility]:
+    def _build_facilities(self, facility_infos: List[FacilityInfo], progress: bool = False) -> List[OutpatientFacility]:
+        """
+        Generate facilities for a list of basic facility information in one batch.
+        
+        Args:
+            facility_infos: Basic facility information, one entry per facility
+            progress: Show a progress bar while assembling facilities
+            
+        Returns:
+            List of OutpatientFacility objects, in the same order
+        """
+        batch = self._draw_batch(len(facility_infos))
+        
+        # Place each facility near its state's reference point (0, 0 if unknown)
+        state_idx = np.array([self._state_index.get(info.state, -1) for info in facility_infos], dtype=np.int64)
+        known_state = state_idx >= 0
+        batch["latitude"] = np.where(known_state, self._state_lat[state_idx] + batch.pop("latitude_offset"), 0.0)
+        batch["longitude"] = np.where(known_state, self._state_lng[state_idx] + batch.pop("longitude_offset"), 0.0)
+        
+        draws = {name: values.tolist() for name, values in batch.items()}
+        
+        # tolist() creates a new str per element; intern categorical values so
+        # facilities share one object per distinct value
+        draws["ownership_type"] = list(map(sys.intern, draws["ownership_type"]))
+        infos = tqdm(facility_infos, desc="Generating facilities", unit="facility", disable=not progress)
+        return [self._build_facility(info, draws, i) for i, info in enumerate(infos)]
+    
+    def generate_sample_facility(self, name: str, city: str, state: str,
+                                 services: Optional[List[str]] = None) -> OutpatientFacility:
+        """
+        Generate a realistic sample facility with comprehensive data.
+        
+        Args:
+            name: Facility name
+            city: Facility city
+            state: Two-letter state code
+            services: Service keys from service_mappings
+            
+        Returns:
+            OutpatientFacility object with sample data
+        """
+        return self._build_facilities([FacilityInfo(name, city, state, services or [])])[0]
+    
+    def create_comprehensive_sample_data(self, target_count: int = 2000, n_workers: int = 1) -> List[OutpatientFacility]:
         """
         Create comprehensive sample dataset of outpatient facilities.
         
         Args:
             target_count: Target number of facilities to generate
+            n_workers: Number of worker processes to generate facilities in
             
         Returns:
             List of OutpatientFacility objects
         """
         logger.info(f"Creating comprehensive sample dataset with {target_count} facilities")
+        self._extraction_ts = datetime.now().isoformat()
         
-        facilities = []
+        facility_infos = []
         
         # Generate facilities based on sample templates
         facilities_per_template = target_count // len(self.sample_facilities)
         
         for template in self.sample_facilities:
-            for i in range(facilities_per_template):
-                # Create variations of each template
-                facility_variant = template.copy()
-                
-                # Add variation to name
-                if i > 0:
-                    suffixes = ["II", "North", "South", "East", "West", "Center", "Associates", "Services"]
-                    facility_variant["name"] = f"{template['name']} {random.choice(suffixes)}"
-                
-                # Create facility
-                facility = self.generate_sample_facility(facility_variant)
-                facilities.append(facility)
-                
-                self.extracted_count += 1
-                
-                if self.extracted_count % 100 == 0:
-                    logger.info(f"Generated {self.extracted_count} sample facilities")
+            # Variations of each template reuse its fields with a suffixed name,
+            # picked from the seeded generator so seeded runs repeat exactly
+            variant_names = [f"{template['name']} {suffix}" for suffix in self.name_suffixes]
+            variant_indices = self._rng.integers(len(variant_names), size=facilities_per_template).tolist()
+            for i, variant_index in enumerate(variant_indices):
+                name = variant_names[variant_index] if i > 0 else template["name"]
+                facility_infos.append(FacilityInfo(name, template["city"], template["state"], template["services"]))
         
         # Fill remaining slots with additional random facilities
-        remaining = target_count - len(facilities)
-        for i in range(remaining):
-            template = random.choice(self.sample_facilities)
-            facility = self.generate_sample_facility(template)
-            facilities.append(facility)
-            self.extracted_count += 1
+        remaining = target_count - len(facility_infos)
+        template_indices = self._rng.integers(len(self.sample_facilities), size=max(remaining, 0)).tolist()
+        for template_index in template_indices:
+            template = self.sample_facilities[template_index]
+            facility_infos.append(FacilityInfo(template["name"], template["city"], template["state"], template["services"]))
+        
+        # Draw all random attributes in vectorized batches, split across
+        # worker processes with independent RNG streams when requested
+        if n_workers > 1 and facility_infos:
+            chunk_size = -(-len(facility_infos) // n_workers)
+            chunks = [facility_infos[i:i + chunk_size] for i in range(0, len(facility_infos), chunk_size)]
+            seeds = self._seed_sequence.spawn(len(chunks))
+            with ProcessPoolExecutor(max_workers=n_workers) as executor:
+                results = executor.map(_generate_chunk, zip(seeds, chunks, itertools.repeat(self._extraction_ts)))
+                results = tqdm(results, desc="Generating chunks", unit="chunk", total=len(chunks))
+                facilities = list(itertools.chain.from_iterable(results))
+        else:
+            facilities = self._build_facilities(facility_infos, progress=True)
+        
+        self.extracted_count += len(facilities)
         
         logger.info(f"Created {len(facilities)} comprehensive sample facilities")
         return facilities
@@ -415,23 +667,12 @@ class SAMHSADemoExtractor:
         Returns:
             List of outpatient-only facilities
         """
-        outpatient_facilities = []
-        
-        for facility in facilities:
-            # Check if facility offers any outpatient services
-            outpatient_services = [
-                facility.standard_outpatient,
-                facility.intensive_outpatient,
-                facility.partial_hospitalization,
-                facility.day_treatment,
-                facility.medication_assisted_treatment,
-                facility.opioid_treatment_program,
-                facility.office_based_opioid_treatment,
-                facility.dui_dwi_programs
-            ]
-            
-            if any(outpatient_services):
-                outpatient_facilities.append(facility)
+        # Check if each facility offers any outpatient services: one AND of
+        # the packed flags against a plain-int mask, no per-facility list
+        outpatient_mask = int(OUTPATIENT_SERVICES)
+        outpatient_facilities = [
+            facility for facility in facilities if facility.service_flags & outpatient_mask
+        ]
         
         logger.info(f"Filtered to {len(outpatient_facilities)} outpatient facilities")
         return outpatient_facilities
@@ -448,39 +689,52 @@ class SAMHSADemoExtractor:
         """
         total_facilities = len(facilities)
         
+        # Boolean fields counted for each statistics section
+        service_fields = [
+            "standard_outpatient",
+            "intensive_outpatient",
+            "partial_hospitalization",
+            "medication_assisted_treatment",
+            "opioid_treatment_program",
+            "dui_dwi_programs",
+            "adolescent_programs"
+        ]
+        payment_fields = {
+            "accepts_medicaid": "accepts_medicaid",
+            "accepts_medicare": "accepts_medicare",
+            "accepts_private_insurance": "accepts_private_insurance",
+            "sliding_fee_scale": "sliding_fee_scale",
+            "free_services": "free_services_available"
+        }
+        population_fields = [
+            "serves_pregnant_women",
+            "serves_military_veterans",
+            "serves_criminal_justice",
+            "serves_lgbtq"
+        ]
+        
+        # Service flags are counted with bitwise ANDs over the packed masks,
+        # other flags with one column-sum over a facility x field matrix
+        service_flags = np.fromiter(map(attrgetter("service_flags"), facilities),
+                                    dtype=np.uint64, count=len(facilities))
+        flag_fields = list(payment_fields.values()) + population_fields
+        flag_counts = dict(zip(flag_fields, flag_matrix(facilities, flag_fields).sum(axis=0).tolist()))
+        
         # Service type statistics
         service_stats = {
-            "standard_outpatient": sum(1 for f in facilities if f.standard_outpatient),
-            "intensive_outpatient": sum(1 for f in facilities if f.intensive_outpatient),
-            "partial_hospitalization": sum(1 for f in facilities if f.partial_hospitalization), 
-            "medication_assisted_treatment": sum(1 for f in facilities if f.medication_assisted_treatment),
-            "opioid_treatment_program": sum(1 for f in facilities if f.opioid_treatment_program),
-            "dui_dwi_programs": sum(1 for f in facilities if f.dui_dwi_programs),
-            "adolescent_programs": sum(1 for f in facilities if f.adolescent_programs)
+            name: int(np.count_nonzero(service_flags & np.uint64(ServiceFlag[name.upper()])))
+            for name in service_fields
         }
         
         # Geographic distribution
-        state_distribution = {}
-        for facility in facilities:
-            state = facility.state
-            state_distribution[state] = state_distribution.get(state, 0) + 1
+        state_distribution = value_counts(facilities, "state")
+        ownership_counts = value_counts(facilities, "ownership_type")
         
         # Payment/insurance statistics
-        payment_stats = {
-            "accepts_medicaid": sum(1 for f in facilities if f.accepts_medicaid),
-            "accepts_medicare": sum(1 for f in facilities if f.accepts_medicare),
-            "accepts_private_insurance": sum(1 for f in facilities if f.accepts_private_insurance),
-            "sliding_fee_scale": sum(1 for f in facilities if f.sliding_fee_scale),
-            "free_services": sum(1 for f in facilities if f.free_services_available)
-        }
+        payment_stats = {key: flag_counts[name] for key, name in payment_fields.items()}
         
         # Special populations
-        population_stats = {
-            "serves_pregnant_women": sum(1 for f in facilities if f.serves_pregnant_women),
-            "serves_military_veterans": sum(1 for f in facilities if f.serves_military_veterans),
-            "serves_criminal_justice": sum(1 for f in facilities if f.serves_criminal_justice),
-            "serves_lgbtq": sum(1 for f in facilities if f.serves_lgbtq)
-        }
+        population_stats = {name: flag_counts[name] for name in population_fields}
         
         return {
             "total_facilities": total_facilities,
@@ -489,81 +743,95 @@ class SAMHSADemoExtractor:
             "payment_options": payment_stats,
             "special_populations": population_stats,
             "ownership_distribution": {
-                "private_nonprofit": sum(1 for f in facilities if f.ownership_type == "Private Non-Profit"),
-                "private_forprofit": sum(1 for f in facilities if f.ownership_type == "Private For-Profit"),
-                "public": sum(1 for f in facilities if f.ownership_type == "Public")
+                "private_nonprofit": ownership_counts.get("Private Non-Profit", 0),
+                "private_forprofit": ownership_counts.get("Private For-Profit", 0),
+                "public": ownership_counts.get("Public", 0)
             }
         }
     
+    def build_output_metadata(self, facilities: List[OutpatientFacility]) -> Dict[str, Any]:
+        """
+        Build the metadata, statistics and field definition sections of the output.
+        
+        Args:
+            facilities: List of OutpatientFacility objects being saved
+            
+        Returns:
+            Dictionary with extraction_metadata, data_statistics and field_definitions
+        """
+        # Generate comprehensive statistics
+        statistics = self.generate_statistics(facilities)
+        
+        return {
+            "extraction_metadata": {
+                **_METADATA_TEMPLATE,
+                "extraction_date": datetime.now().isoformat(),
+                "total_facilities": len(facilities)
+            },
+            "data_statistics": statistics,
+            "field_definitions": dict(_FIELD_DEFINITIONS)
+        }
+    
     def save_to_json(self, facilities: List[OutpatientFacility], filepath: str):
         """
         Save facilities data to JSON file with comprehensive metadata.
         
         Args:
             facilities: List of OutpatientFacility objects
-            filepath: Output file path
+            filepath: Output file path; a .gz or .zst suffix compresses the output
         """
         try:
-            # Convert facilities to dictionaries
-            facilities_data = []
-            for facility in facilities:
-                facility_dict = asdict(facility)
-                facilities_data.append(facility_dict)
+            # Create comprehensive output structure
+            output_data = {**self.build_output_metadata(facilities), "facilities": []}
+            
+            # Ensure directory exists
+            os.makedirs(os.path.dirname(filepath), exist_ok=True)
             
-            # Generate comprehensive statistics
-            statistics = self.generate_statistics(facilities)
+            # Save to file, streaming facilities one record at a time after the
+            # header sections instead of building the whole facilities list first
+            header = orjson.dumps(output_data, option=orjson.OPT_INDENT_2 | orjson.OPT_SERIALIZE_NUMPY)
+            header = header[:header.rindex(b"[]")]
+            with open_output(filepath) as f:
+                f.write(header)
+                f.write(b"[")
+                separator = b"\n    "
+                for facility in facilities:
+                    f.write(separator)
+                    f.write(dump_facility(facility))
+                    separator = b",\n    "
+                f.write(b"\n  ]\n}\n")
             
-            # Create comprehensive output structure
-            output_data = {
-                "extraction_metadata": {
-                    "extraction_date": datetime.now().isoformat(),
-                    "extraction_type": "Comprehensive Demo Dataset",
-                    "data_source": "SAMHSA N-SUMHSS (Simulated)",
-                    "survey_year": 2023,
-                    "total_facilities": len(facilities_data),
-                    "extraction_method": "Demo/Simulation",
-                    "target_service_types": [
-                        "Standard Outpatient (OP)",
-                        "Intensive Outpatient (IOP)", 
-                        "Partial Hospitalization (PHP/Day Treatment)",
-                        "Medication-Assisted Treatment (MAT) clinics",
-                        "Opioid Treatment Programs (OTP/Methadone clinics)",
-                        "Office-based opioid treatment (OBOT)",
-                        "DUI/DWI programs",
-                        "Adolescent outpatient programs"
-                    ],
-                    "geographic_coverage": "All US States and Territories",
-                    "data_completeness": "Comprehensive - All Fields Populated",
-                    "quality_notes": [
-                        "This is demonstration data showing the structure and format",
-                        "Real SAMHSA data would be extracted from N-SUMHSS dataset",
-                        "All facility information is simulated for demo purposes"
-                    ]
-                },
-                "data_statistics": statistics,
-                "field_definitions": {
-                    "facility_name": "Official name of the treatment facility",
-                    "facility_id": "Unique identifier from SAMHSA database",
-                    "standard_outpatient": "Offers standard outpatient treatment services",
-                    "intensive_outpatient": "Offers intensive outpatient program (IOP)",
-                    "partial_hospitalization": "Offers partial hospitalization/day treatment",
-                    "medication_assisted_treatment": "Provides medication-assisted treatment",
-                    "opioid_treatment_program": "Licensed opioid treatment program",
-                    "serves_adolescents": "Provides services to adolescent populations",
-                    "accepts_medicaid": "Accepts Medicaid insurance",
-                    "sliding_fee_scale": "Offers sliding fee scale based on income"
-                },
-                "facilities": facilities_data
-            }
+            logger.info(f"Saved {len(facilities)} facilities to {filepath}")
+            logger.info(f"File size: {os.path.getsize(filepath) / 1024 / 1024:.2f} MB")
             
+        except Exception as e:
+            logger.error(f"Error saving data to {filepath}: {e}")
+    
+    def save_to_ndjson(self, facilities: List[OutpatientFacility], filepath: str):
+        """
+        Save facilities as JSON Lines, one facility per line, with the metadata,
+        statistics and field definitions in a companion .meta.json file.
+        
+        Args:
+            facilities: List of OutpatientFacility objects
+            filepath: Output file path for the facility records; a .gz or .zst
+                suffix compresses them
+        """
+        meta_path = ndjson_meta_path(filepath)
+        try:
             # Ensure directory exists
             os.makedirs(os.path.dirname(filepath), exist_ok=True)
             
-            # Save to file
-            with open(filepath, 'w', encoding='utf-8') as f:
-                json.dump(output_data, f, indent=2, ensure_ascii=False)
+            with open_output(filepath) as f:
+                for facility in facilities:
+                    f.write(dump_facility(facility))
+                    f.write(b"\n")
+            
+            with open(meta_path, 'wb') as f:
+                f.write(orjson.dumps(self.build_output_metadata(facilities), option=orjson.OPT_INDENT_2))
             
-            logger.info(f"Saved {len(facilities_data)} facilities to {filepath}")
+            logger.info(f"Saved {len(facilities)} facilities to {filepath}")
+            logger.info(f"Metadata saved to {meta_path}")
             logger.info(f"File size: {os.path.getsize(filepath) / 1024 / 1024:.2f} MB")
             
         except Exception as e:
@@ -578,10 +846,10 @@ class SAMHSADemoExtractor:
             target_count: Number of facilities to generate
             
         Returns:
-            Path to the saved JSON file
+            Path to the saved JSON Lines file
         """
         if output_path is None:
-            output_path = "/Users/benweiss/Code/narr_extractor/03_raw_data/treatment_centers/outpatient/samhsa/samhsa_outpatient_facilities.json"
+            output_path = "/Users/benweiss/Code/narr_extractor/03_raw_data/treatment_centers/outpatient/samhsa/samhsa_outpatient_facilities.jsonl.zst"
         
         logger.info("Starting SAMHSA outpatient treatment centers DEMO extraction")
         
@@ -592,8 +860,8 @@ class SAMHSADemoExtractor:
             # Filter for outpatient facilities only
             outpatient_facilities = self.filter_outpatient_only(all_facilities)
             
-            # Save to JSON
-            self.save_to_json(outpatient_facilities, output_path)
+            # Save as JSON Lines plus metadata file
+            self.save_to_ndjson(outpatient_facilities, output_path)
             
             logger.info(f"Demo extraction completed successfully!")
             logger.info(f"Total outpatient facilities: {len(outpatient_facilities)}")
@@ -604,6 +872,19 @@ class SAMHSADemoExtractor:
             logger.error(f"Demo extraction failed: {e}")
             raise
 
+def _generate_chunk(args) -> List[OutpatientFacility]:
+    """Worker entry point: generate one chunk of facilities from its own seed."""
+    seed, facility_infos, extraction_ts = args
+    extractor = SAMHSADemoExtractor(seed=seed)
+    extractor._extraction_ts = extraction_ts
+    facilities = extractor._build_facilities(facility_infos)
+    
+    # mappingproxy does not pickle; each facility goes back to the parent
+    # with its own plain copy of the shared hours
+    for facility in facilities:
+        facility.hours_of_operation = dict(facility.hours_of_operation)
+    return facilities
+
 def main():
     """Main execution function."""
     extractor = SAMHSADemoExtractor()
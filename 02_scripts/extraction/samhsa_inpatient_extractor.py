@@ -22,16 +22,21 @@ Author: Claude Code
 Date: 2025-07-31
 """
 
-import requests
-import json
+import asyncio
+import aiohttp
+from aiohttp_client_cache import CachedSession, SQLiteBackend
+import ahocorasick
 import time
+import orjson
+import ijson
 import logging
-from typing import Dict, List, Optional, Any
-from dataclasses import dataclass, asdict
+from typing import Awaitable, Callable, Dict, List, NamedTuple, Optional, Set, Tuple, Any
+from dataclasses import dataclass, fields
 from urllib.parse import urlencode
 import os
-from datetime import datetime
-from bs4 import BeautifulSoup
+from datetime import datetime, timedelta, timezone
+from email.utils import parsedate_to_datetime
+from selectolax.lexbor import LexborCSSSelector, LexborHTMLParser, LexborNode
 import re
 import random
 
@@ -46,7 +51,17 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
-@dataclass
+# List fields defaulted to a fresh [] by InpatientFacility.__post_init__
+LIST_FIELDS = (
+    'dba_names', 'license_numbers', 'certifications', 'accreditations',
+    'service_types', 'treatment_approaches', 'treatment_modalities',
+    'medical_staff_credentials', 'medical_detox_protocols', 'transfer_agreements',
+    'step_down_programs', 'age_groups_accepted', 'special_populations',
+    'gender_accepted', 'languages_spoken', 'insurance_accepted',
+    'payment_options', 'admission_criteria'
+)
+
+@dataclass(slots=True)
 class InpatientFacility:
     """Data structure for SAMHSA inpatient/hospital treatment facility information."""
     
@@ -161,21 +176,149 @@ class InpatientFacility:
     
     def __post_init__(self):
         """Initialize list fields if None."""
-        list_fields = [
-            'dba_names', 'license_numbers', 'certifications', 'accreditations',
-            'service_types', 'treatment_approaches', 'treatment_modalities',
-            'medical_staff_credentials', 'medical_detox_protocols', 'transfer_agreements',
-            'step_down_programs', 'age_groups_accepted', 'special_populations',
-            'gender_accepted', 'languages_spoken', 'insurance_accepted',
-            'payment_options', 'admission_criteria'
-        ]
-        
-        for field in list_fields:
+        for field in LIST_FIELDS:
             if getattr(self, field) is None:
                 setattr(self, field, [])
                 
         if self.extraction_date == "":
             self.extraction_date = datetime.now().isoformat()
+    
+    @property
+    def dedup_key(self) -> Tuple[str, str]:
+        """Case-insensitive (name, address) identity used to deduplicate facilities."""
+        return (self.facility_name.casefold(), self.address_line1.casefold())
+    
+    def to_dict(self) -> Dict[str, Any]:
+        """Shallow field-name to value mapping; unlike asdict() the lists are not copied."""
+        return {name: getattr(self, name) for name in FACILITY_FIELD_NAMES}
+
+# Field names in declaration order, cached for to_dict()
+FACILITY_FIELD_NAMES = tuple(field.name for field in fields(InpatientFacility))
+
+def retry_after_seconds(value: Optional[str], default: float) -> float:
+    """Seconds to wait according to a Retry-After header (delta-seconds or HTTP date)."""
+    if not value:
+        return default
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        retry_at = parsedate_to_datetime(value)
+        return max(0.0, (retry_at - datetime.now(timezone.utc)).total_seconds())
+    except (TypeError, ValueError):
+        return default
+
+# Facility card selectors
+CARD_SELECTOR = '.facility-card, .treatment-facility, .result-item'
+CARD_NAME_SELECTOR = '.facility-name, .name, h2, h3'
+CARD_SERVICES_SELECTOR = '.services, .treatment-services'
+CARD_PHONE_SELECTOR = '.phone, .contact-phone'
+
+# One selector engine reused for every card lookup; node.css_first() sets up
+# a new one per call
+_CSS_SELECTOR = LexborCSSSelector()
+
+def css_first(query: str, node: LexborNode) -> Optional[LexborNode]:
+    """First node under node matching query, or None.
+    
+    Lexbor matches node itself as well; skip it so a card is never its own
+    name, services or phone element.
+    """
+    matches = _CSS_SELECTOR.find_first(query, node)
+    if not matches:
+        return None
+    if matches[0] != node:
+        return matches[0]
+    # node itself comes first in document order; take the next match
+    matches = _CSS_SELECTOR.find(query, node)
+    return matches[1] if len(matches) > 1 else None
+
+# Item prefix of each array the facilities can come from, mapped to the
+# prefix of the array itself ('' is the document root)
+API_ITEM_PREFIXES = {'facilities.item': 'facilities', 'results.item': 'results', 'item': ''}
+
+async def stream_api_facilities(response: aiohttp.ClientResponse) -> List[Dict]:
+    """
+    Decode the facilities list of an API response while the body streams in.
+    
+    Follows the same precedence as a whole-body parse: the 'facilities'
+    array, else the 'results' array, else a top-level array. Only elements
+    of those arrays are collected; values under any other key are skipped.
+    """
+    found = {prefix: [] for prefix in API_ITEM_PREFIXES}
+    arrays = set()  # prefixes in API_ITEM_PREFIXES values that hold an array
+    top_keys = set()
+    builder, depth, target = None, 0, None
+    seen_any = False
+    
+    try:
+        async for prefix, event, value in ijson.parse_async(response.content, use_float=True):
+            seen_any = True
+            
+            # Inside an item: feed the builder until its container closes
+            if builder is not None:
+                builder.event(event, value)
+                if event in ('start_map', 'start_array'):
+                    depth += 1
+                elif event in ('end_map', 'end_array'):
+                    depth -= 1
+                    if depth == 0:
+                        target.append(builder.value)
+                        builder = None
+                continue
+            
+            if prefix == '' and event == 'map_key':
+                top_keys.add(value)
+            elif event == 'start_array' and prefix in ('', 'facilities', 'results'):
+                arrays.add(prefix)
+            elif prefix in API_ITEM_PREFIXES and API_ITEM_PREFIXES[prefix] in arrays:
+                if event in ('start_map', 'start_array'):
+                    builder, depth, target = ijson.ObjectBuilder(), 1, found[prefix]
+                    builder.event(event, value)
+                elif event not in ('end_map', 'end_array'):
+                    found[prefix].append(value)
+    except ijson.IncompleteJSONError:
+        # An empty body carries no facilities
+        if seen_any:
+            raise
+    
+    if 'facilities' in top_keys:
+        return found['facilities.item']
+    if 'results' in top_keys:
+        return found['results.item']
+    return found['item']
+
+class TextScan(NamedTuple):
+    """Keyword matches from one pass over a raw facility's services, name and type."""
+    tags: Set[str]  # "incl"/"excl" keyword tags found anywhere
+    service_terms: Set[str]  # service flag terms found in the services text
+    hospital_system: str  # earliest hospital_systems entry found in the name, or ""
+
+class RateLimiter:
+    """Token bucket bounding the aggregate request rate of concurrent tasks."""
+    
+    def __init__(self, rate: float, burst: int = 1):
+        self.rate = rate
+        self.burst = burst
+        self._tokens = float(burst)
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+    
+    async def acquire(self):
+        """Wait until another request may be sent."""
+        async with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            
+            if self._tokens < 1:
+                # Waiters queue on the lock, so tokens go out in arrival order
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+                self._tokens = 0.0
+                self._updated = time.monotonic()
+            else:
+                self._tokens -= 1
 
 class SAMHSAInpatientExtractor:
     """Main class for extracting SAMHSA inpatient/hospital treatment facility data."""
@@ -184,14 +327,35 @@ class SAMHSAInpatientExtractor:
         """Initialize the SAMHSA inpatient extractor."""
         self.base_url = "https://findtreatment.gov"
         self.api_base = f"{self.base_url}/api"
-        self.session = requests.Session()
         
-        # Rotate user agents
-        self.user_agents = [
-            'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36',
-            'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36',
-            'Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36'
-        ]
+        # One pooled session per run, opened by extract_all_states; the
+        # semaphore caps how many requests are in flight at once and the
+        # rate limiter how many start per second across all states
+        self.session: Optional[aiohttp.ClientSession] = None
+        self.max_concurrent_requests = 20
+        self._request_slots = asyncio.Semaphore(self.max_concurrent_requests)
+        self.rate_limiter = RateLimiter(rate=10, burst=10)
+        
+        # Successful responses are cached on disk (SQLite) for a day, so
+        # re-runs and overlapping state/city queries are served locally;
+        # set cache_name to None to always go to the network
+        self.cache_name: Optional[str] = 'samhsa_cache'
+        self.cache_expire_after = timedelta(days=1)
+        
+        # First API endpoint that returned facilities, reused by later searches;
+        # the lock lets only one search probe the endpoints at a time, and the
+        # misses count empty answers since that endpoint was picked
+        self._working_endpoint: Optional[str] = None
+        self._endpoint_lock = asyncio.Lock()
+        self._endpoint_misses = 0
+        self.max_endpoint_misses = 5
+        
+        # Headers sent with every request; aiohttp negotiates compression
+        # and keeps connections alive on its own
+        self.headers = {
+            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36',
+            'Accept': 'application/json, text/html;q=0.9'
+        }
         
         self.facilities = []
         self.extracted_count = 0
@@ -222,37 +386,104 @@ class SAMHSAInpatientExtractor:
             'behavioral health', 'psychiatric', 'mental health center',
             'medical', 'health center', 'treatment center', 'recovery center'
         ]
+        
+        # Service flags set by parse_facility_data from the services text: a
+        # flag is set when all terms of any one of its groups appear
+        self.service_flag_terms = {
+            'hospital_inpatient_detox': [{'hospital', 'detox'}],
+            'medical_detox_unit': [{'medical detox'}],
+            'psychiatric_unit': [{'psychiatric'}],
+            'dual_diagnosis_inpatient': [{'dual diagnosis', 'inpatient'}],
+            'medical_stabilization': [{'medical stabilization'}],
+            'asam_level_4': [{'asam', '4'}, {'asam', 'iv'}],
+            'acute_care_addiction': [{'acute'}],
+            'emergency_detox': [{'emergency', 'detox'}],
+            'alcohol_detox': [{'alcohol'}],
+            'opioid_detox': [{'opioid'}, {'opiate'}],
+            'benzodiazepine_detox': [{'benzo'}]
+        }
+        
+        # Pure outpatient facilities are excluded
+        self.exclude_keywords = ['outpatient only', 'op only', 'office based only']
+        
+        # One automaton for the inpatient (incl) and exclusion (excl) keywords,
+        # the service flag terms (plus '24' and 'emergency' for emergency
+        # admission) and the hospital systems, so each facility's text is
+        # scanned once for all of them. Each word maps to (tags, whether it is
+        # a service term, hospital_systems priority or None, word).
+        service_terms = set().union(*(set().union(*groups) for groups in self.service_flag_terms.values()))
+        service_terms |= {'24', 'emergency'}
+        system_priority = {system: priority for priority, system in reversed(list(enumerate(self.hospital_systems)))}
+        
+        self._text_automaton = ahocorasick.Automaton()
+        words = set(self.inpatient_keywords) | set(self.exclude_keywords) | service_terms | set(system_priority)
+        for word in words:
+            tags = frozenset(
+                tag for tag, keywords in (("incl", self.inpatient_keywords), ("excl", self.exclude_keywords))
+                if word in keywords
+            )
+            self._text_automaton.add_word(word, (tags, word in service_terms, system_priority.get(word), word))
+        self._text_automaton.make_automaton()
     
-    def get_random_user_agent(self) -> str:
-        """Get a random user agent string."""
-        return random.choice(self.user_agents)
+    def open_session(self) -> aiohttp.ClientSession:
+        """Create the pooled (and, with cache_name set, cached) HTTP session shared by all requests of a run."""
+        connector = aiohttp.TCPConnector(limit=50, limit_per_host=10, ttl_dns_cache=600,
+                                         keepalive_timeout=60)
+        timeout = aiohttp.ClientTimeout(total=30, connect=10)
+        
+        if self.cache_name is None:
+            return aiohttp.ClientSession(connector=connector, timeout=timeout, headers=self.headers)
+        
+        cache = SQLiteBackend(self.cache_name, expire_after=self.cache_expire_after, allowed_codes=(200,))
+        return CachedSession(cache=cache, connector=connector, timeout=timeout, headers=self.headers)
     
-    def make_request(self, url: str, params: dict = None, retries: int = 3) -> Optional[requests.Response]:
-        """Make HTTP request with error handling and retries."""
+    async def make_request(self, url: str, params: dict = None, retries: int = 3,
+                           consume: Optional[Callable[[aiohttp.ClientResponse], Awaitable[Any]]] = None) -> Any:
+        """Make HTTP request with error handling and retries.
+        
+        Returns the body of a 200 response, or what consume returns when given
+        the open response instead; None when every attempt failed.
+        """
         for attempt in range(retries):
             try:
-                self.session.headers['User-Agent'] = self.get_random_user_agent()
-                response = self.session.get(url, params=params, timeout=30)
+                await self.rate_limiter.acquire()
+                async with self._request_slots:
+                    async with self.session.get(url, params=params) as response:
+                        if response.status == 200:
+                            if consume is not None:
+                                return await consume(response)
+                            return await response.read()
+                        status = response.status
+                        retry_after = response.headers.get('Retry-After')
                 
-                if response.status_code == 200:
-                    return response
-                elif response.status_code == 429:
-                    wait_time = (2 ** attempt) * 5
+                if status == 429:
+                    wait_time = retry_after_seconds(retry_after, default=(2 ** attempt) * 5)
                     logger.warning(f"Rate limited. Waiting {wait_time} seconds...")
-                    time.sleep(wait_time)
+                    await asyncio.sleep(wait_time)
                 else:
-                    logger.warning(f"HTTP {response.status_code} for {url}")
+                    logger.warning(f"HTTP {status} for {url}")
                     
-            except requests.exceptions.RequestException as e:
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
                 logger.warning(f"Request attempt {attempt + 1} failed: {e}")
                 if attempt < retries - 1:
-                    time.sleep(random.uniform(1, 3))
+                    await asyncio.sleep(random.uniform(1, 3))
         
         return None
     
-    def search_facilities_api(self, state: str = None, city: str = None, 
-                            service_type: str = 'inpatient') -> List[Dict]:
-        """Search for facilities using API endpoints."""
+    async def query_api_endpoint(self, endpoint: str, params: dict) -> List[Dict]:
+        """Query one API endpoint and return the facilities list it responds with."""
+        logger.info(f"Trying API endpoint: {endpoint}")
+        
+        # Facilities are decoded from the response stream, so the raw body
+        # is never held in memory alongside the parsed records
+        facilities = await self.make_request(endpoint, params=params, consume=stream_api_facilities)
+        
+        return facilities or []
+    
+    async def search_facilities_api(self, state: str = None, city: str = None, 
+                                    service_type: str = 'inpatient',
+                                    states: Optional[List[str]] = None) -> List[Dict]:
+        """Search for facilities using API endpoints; states queries several states at once."""
         params = {
             'distance': 100,  # Larger radius for hospitals
             'service_type': service_type,
@@ -261,10 +492,10 @@ class SAMHSAInpatientExtractor:
         
         if state:
             params['state'] = state
+        if states:
+            params['state[]'] = states
         if city:
             params['city'] = city
-            
-        facilities = []
         
         # Try multiple potential API endpoints
         endpoints = [
@@ -274,32 +505,101 @@ class SAMHSAInpatientExtractor:
             f"{self.base_url}/locator/api/search"
         ]
         
+        # Once an endpoint has answered, query only that one; until then,
+        # probe the endpoints one at a time under the lock so concurrent
+        # searches wait for a single probe instead of each firing all of them
+        endpoint = self._working_endpoint
+        if endpoint is None:
+            async with self._endpoint_lock:
+                endpoint = self._working_endpoint
+                if endpoint is None:
+                    return await self.probe_api_endpoints(endpoints, params)
+        
+        try:
+            facilities = await self.query_api_endpoint(endpoint, params)
+        except Exception as e:
+            logger.warning(f"API endpoint {endpoint} failed: {e}")
+            facilities = []
+        
+        if facilities:
+            logger.info(f"Found {len(facilities)} facilities via API")
+            return facilities
+        
+        self.record_endpoint_miss(endpoint)
+        return []
+    
+    async def probe_api_endpoints(self, endpoints: List[str], params: dict) -> List[Dict]:
+        """Query the endpoints in order and remember the first one that returns facilities."""
         for endpoint in endpoints:
             try:
-                logger.info(f"Trying API endpoint: {endpoint}")
-                response = self.make_request(endpoint, params=params)
-                
-                if response and response.status_code == 200:
-                    data = response.json()
-                    
-                    if 'facilities' in data:
-                        facilities = data['facilities']
-                    elif 'results' in data:
-                        facilities = data['results']
-                    elif isinstance(data, list):
-                        facilities = data
-                    
-                    if facilities:
-                        logger.info(f"Found {len(facilities)} facilities via API")
-                        break
-                        
+                facilities = await self.query_api_endpoint(endpoint, params)
             except Exception as e:
                 logger.warning(f"API endpoint {endpoint} failed: {e}")
                 continue
+            
+            if facilities:
+                logger.info(f"Found {len(facilities)} facilities via API")
+                self._working_endpoint = endpoint
+                self._endpoint_misses = 0
+                return facilities
         
-        return facilities
+        return []
+    
+    def record_endpoint_miss(self, endpoint: str):
+        """Count an empty answer from endpoint; forget it after too many so the next search re-probes."""
+        # Answers from an endpoint that was already replaced belong to an
+        # earlier probe cycle and are not counted against the current one
+        if endpoint != self._working_endpoint:
+            return
+        
+        self._endpoint_misses += 1
+        if self._endpoint_misses >= self.max_endpoint_misses:
+            logger.info(f"API endpoint {endpoint} returned nothing {self._endpoint_misses} times; re-probing")
+            self._working_endpoint = None
+            self._endpoint_misses = 0
+    
+    @staticmethod
+    def facility_state(facility_data: Dict) -> Optional[str]:
+        """State code of a raw facility record, if it has one."""
+        address = facility_data.get('address')
+        return address.get('state') if isinstance(address, dict) else None
     
-    def search_facilities_web(self, state: str, city: str = None) -> List[Dict]:
+    async def probe_state_batching(self) -> bool:
+        """Check with one two-state request whether the API accepts several states per query."""
+        probe_states = self.us_states[:2]
+        if len(probe_states) < 2:
+            return False
+        
+        facilities = await self.search_facilities_api(states=probe_states)
+        found_states = {self.facility_state(facility_data) for facility_data in facilities}
+        enabled = set(probe_states) <= found_states
+        
+        logger.info(f"Multi-state API queries {'enabled' if enabled else 'not supported'}")
+        return enabled
+    
+    async def search_states_in_batches(self, batch_size: int = 10) -> Dict[str, Optional[List[Dict]]]:
+        """
+        Query the API for groups of states at a time and bucket the results by state.
+        
+        Returns:
+            API results for each state the batches returned facilities for;
+            states missing from it (possibly cut off by the server's result
+            cap on a multi-state query) are then queried on their own
+        """
+        batches = [self.us_states[i:i + batch_size] for i in range(0, len(self.us_states), batch_size)]
+        results = await asyncio.gather(*(self.search_facilities_api(states=batch) for batch in batches))
+        
+        results_by_state = {}
+        for batch, facilities in zip(batches, results):
+            batch_states = set(batch)
+            for facility_data in facilities:
+                state = self.facility_state(facility_data)
+                if state in batch_states:
+                    results_by_state.setdefault(state, []).append(facility_data)
+        
+        return results_by_state
+    
+    async def search_facilities_web(self, state: str, city: str = None) -> List[Dict]:
         """Search for facilities using web scraping."""
         facilities = []
         
@@ -317,15 +617,15 @@ class SAMHSAInpatientExtractor:
         search_url = f"{self.base_url}/locator?{urlencode(search_params, doseq=True)}"
         
         try:
-            response = self.make_request(search_url)
-            if response:
-                soup = BeautifulSoup(response.content, 'html.parser')
+            body = await self.make_request(search_url)
+            if body:
+                tree = LexborHTMLParser(body)
                 
                 # Extract JSON data from page
-                script_tags = soup.find_all('script', type='application/json')
+                script_tags = tree.css('script[type="application/json"]')
                 for script in script_tags:
                     try:
-                        data = json.loads(script.string)
+                        data = orjson.loads(script.text() or '{}')
                         if 'facilities' in data:
                             facilities.extend(data['facilities'])
                         elif 'props' in data and 'pageProps' in data['props']:
@@ -336,7 +636,7 @@ class SAMHSAInpatientExtractor:
                         continue
                 
                 # Look for facility cards
-                facility_cards = soup.select('.facility-card, .treatment-facility, .result-item')
+                facility_cards = tree.css(CARD_SELECTOR)
                 for card in facility_cards:
                     facility_data = self.parse_facility_card(card, state)
                     if facility_data:
@@ -347,7 +647,7 @@ class SAMHSAInpatientExtractor:
         
         return facilities
     
-    def parse_facility_card(self, card, state: str) -> Optional[Dict]:
+    def parse_facility_card(self, card: LexborNode, state: str) -> Optional[Dict]:
         """Parse facility information from HTML card element."""
         try:
             facility = {
@@ -358,20 +658,20 @@ class SAMHSAInpatientExtractor:
             }
             
             # Extract name
-            name_elem = card.select_one('.facility-name, .name, h2, h3')
+            name_elem = css_first(CARD_NAME_SELECTOR, card)
             if name_elem:
-                facility['name'] = name_elem.get_text(strip=True)
+                facility['name'] = name_elem.text(strip=True)
             
             # Extract services
-            services_elem = card.select_one('.services, .treatment-services')
+            services_elem = css_first(CARD_SERVICES_SELECTOR, card)
             if services_elem:
-                services_text = services_elem.get_text(strip=True)
+                services_text = services_elem.text(strip=True)
                 facility['services'] = [s.strip() for s in services_text.split(',')]
             
             # Extract contact info
-            phone_elem = card.select_one('.phone, .contact-phone')
+            phone_elem = css_first(CARD_PHONE_SELECTOR, card)
             if phone_elem:
-                facility['contact']['phone'] = phone_elem.get_text(strip=True)
+                facility['contact']['phone'] = phone_elem.text(strip=True)
             
             # Check if it's a hospital/inpatient facility
             if self.is_inpatient_facility(facility):
@@ -382,8 +682,11 @@ class SAMHSAInpatientExtractor:
         
         return None
     
-    def parse_facility_data(self, facility_data: Dict) -> InpatientFacility:
-        """Parse raw facility data into InpatientFacility object."""
+    def parse_facility_data(self, facility_data: Dict, scan: Optional[TextScan] = None) -> InpatientFacility:
+        """Parse raw facility data into InpatientFacility object.
+        
+        scan, when given, is this facility's scan_facility_text result.
+        """
         facility = InpatientFacility()
         
         try:
@@ -391,12 +694,11 @@ class SAMHSAInpatientExtractor:
             facility.facility_name = facility_data.get('name', '')
             facility.facility_id = str(facility_data.get('id', ''))
             
+            if scan is None:
+                scan = self.scan_facility_text(facility_data)
+            
             # Identify hospital system
-            name_lower = facility.facility_name.lower()
-            for system in self.hospital_systems:
-                if system in name_lower:
-                    facility.hospital_system = system.title()
-                    break
+            facility.hospital_system = scan.hospital_system.title()
             
             # Address Information
             address = facility_data.get('address', {})
@@ -423,32 +725,12 @@ class SAMHSAInpatientExtractor:
             facility.service_types = services if isinstance(services, list) else []
             
             # Parse inpatient-specific services
-            service_str = ' '.join(facility.service_types).lower()
-            
-            if 'hospital' in service_str and 'detox' in service_str:
-                facility.hospital_inpatient_detox = True
-            if 'medical detox' in service_str:
-                facility.medical_detox_unit = True
-            if 'psychiatric' in service_str:
-                facility.psychiatric_unit = True
-            if 'dual diagnosis' in service_str and 'inpatient' in service_str:
-                facility.dual_diagnosis_inpatient = True
-            if 'medical stabilization' in service_str:
-                facility.medical_stabilization = True
-            if 'asam' in service_str and ('4' in service_str or 'iv' in service_str):
-                facility.asam_level_4 = True
-            if 'acute' in service_str:
-                facility.acute_care_addiction = True
-            if 'emergency' in service_str and 'detox' in service_str:
-                facility.emergency_detox = True
-            
-            # Check for detox protocols
-            if 'alcohol' in service_str:
-                facility.alcohol_detox = True
-            if 'opioid' in service_str or 'opiate' in service_str:
-                facility.opioid_detox = True
-            if 'benzo' in service_str:
-                facility.benzodiazepine_detox = True
+            service_terms = scan.service_terms
+            
+            # Inpatient-specific services and detox protocols
+            for flag, term_groups in self.service_flag_terms.items():
+                if any(terms <= service_terms for terms in term_groups):
+                    setattr(facility, flag, True)
             
             # Treatment approaches and modalities
             facility.treatment_approaches = facility_data.get('treatment_approaches', [])
@@ -470,6 +752,12 @@ class SAMHSAInpatientExtractor:
             facility.tricare_accepted = insurance.get('tricare', False)
             facility.va_approved = insurance.get('va', False)
             
+            # Hospitals and medical centers are assumed to accept Medicare and
+            # Medicaid until provider directories can confirm it
+            if facility.hospital_system in ('Hospital', 'Medical Center'):
+                facility.medicare_accepted = True
+                facility.medicaid_accepted = True
+            
             # License and certification
             facility.license_numbers = facility_data.get('licenses', [])
             facility.certifications = facility_data.get('certifications', [])
@@ -481,7 +769,7 @@ class SAMHSAInpatientExtractor:
             facility.parent_organization = facility_data.get('parent_organization', '')
             
             # Emergency capabilities
-            if '24' in service_str or 'emergency' in service_str:
+            if '24' in service_terms or 'emergency' in service_terms:
                 facility.emergency_admission_capable = True
             
             # Metadata
@@ -492,8 +780,8 @@ class SAMHSAInpatientExtractor:
             
         return facility
     
-    def is_inpatient_facility(self, facility_data: Dict) -> bool:
-        """Determine if facility offers inpatient/hospital services."""
+    def scan_facility_text(self, facility_data: Dict) -> TextScan:
+        """Scan a raw facility's services, name and type once for all keywords."""
         # Check services
         services = facility_data.get('services', [])
         services_text = ' '.join(services).lower() if services else ''
@@ -507,39 +795,72 @@ class SAMHSAInpatientExtractor:
         # Combine all text
         combined_text = f"{services_text} {name_text} {facility_type}"
         
-        # Must have inpatient/hospital keywords
-        has_inpatient = any(keyword in combined_text for keyword in self.inpatient_keywords)
+        # Service terms count only inside the leading services text, and only
+        # when services is a list (parse_facility_data ignores anything else);
+        # hospital systems only inside the name
+        services_end = len(services_text) if isinstance(services, list) else 0
+        name_start = len(services_text) + 1
+        name_end = name_start + len(name_text)
+        
+        tags = set()
+        service_terms = set()
+        best_system = None
+        for end, (word_tags, is_service_term, priority, word) in self._text_automaton.iter(combined_text):
+            tags |= word_tags
+            if is_service_term and end < services_end:
+                service_terms.add(word)
+            if (priority is not None and name_start <= end - len(word) + 1 and end < name_end
+                    and (best_system is None or priority < best_system[0])):
+                best_system = (priority, word)
         
-        # Exclude pure outpatient facilities
-        exclude_keywords = ['outpatient only', 'op only', 'office based only']
-        is_excluded = any(keyword in combined_text for keyword in exclude_keywords)
+        return TextScan(tags, service_terms, best_system[1] if best_system else "")
+    
+    def is_inpatient_facility(self, facility_data: Dict) -> bool:
+        """Determine if facility offers inpatient/hospital services."""
+        tags = self.scan_facility_text(facility_data).tags
         
-        return has_inpatient and not is_excluded
+        # Must have inpatient/hospital keywords and no pure outpatient ones
+        return "incl" in tags and "excl" not in tags
     
-    def extract_state_facilities(self, state: str) -> List[InpatientFacility]:
-        """Extract all inpatient facilities for a specific state."""
+    def parse_inpatient_facility(self, facility_data: Dict) -> Optional[InpatientFacility]:
+        """Parse raw facility data if it offers inpatient/hospital services, scanning its text once."""
+        scan = self.scan_facility_text(facility_data)
+        
+        if "incl" in scan.tags and "excl" not in scan.tags:
+            return self.parse_facility_data(facility_data, scan)
+        return None
+    
+    async def extract_state_facilities(self, state: str,
+                                       api_results: Optional[List[Dict]] = None) -> List[InpatientFacility]:
+        """Extract all inpatient facilities for a specific state.
+        
+        api_results, when given, are this state's results from a batched
+        multi-state API query and replace the per-state API search.
+        """
         logger.info(f"Extracting inpatient facilities for {state}")
         
         facilities = []
-        unique_facilities = {}
-        
-        # Try API first
-        api_results = self.search_facilities_api(state=state)
+        seen_keys: Set[Tuple[str, str]] = set()
         
-        # Also try web scraping
-        web_results = self.search_facilities_web(state=state)
+        # Try API and web scraping together
+        if api_results is None:
+            api_results, web_results = await asyncio.gather(
+                self.search_facilities_api(state=state),
+                self.search_facilities_web(state=state)
+            )
+        else:
+            web_results = await self.search_facilities_web(state=state)
         
         # Combine results
         all_results = api_results + web_results
         
         for facility_data in all_results:
-            if self.is_inpatient_facility(facility_data):
-                facility = self.parse_facility_data(facility_data)
-                
+            facility = self.parse_inpatient_facility(facility_data)
+            if facility is not None:
                 # Deduplicate by name and address
-                facility_key = f"{facility.facility_name}_{facility.address_line1}".lower()
-                if facility_key not in unique_facilities:
-                    unique_facilities[facility_key] = facility
+                facility_key = facility.dedup_key
+                if facility_key not in seen_keys:
+                    seen_keys.add(facility_key)
                     facilities.append(facility)
                     self.extracted_count += 1
                     
@@ -561,107 +882,128 @@ class SAMHSAInpatientExtractor:
         }
         
         if state in major_cities:
-            for city in major_cities[state]:
-                time.sleep(random.uniform(2, 4))
-                
-                city_api_results = self.search_facilities_api(state=state, city=city)
-                city_web_results = self.search_facilities_web(state=state, city=city)
-                
-                for facility_data in city_api_results + city_web_results:
-                    if self.is_inpatient_facility(facility_data):
-                        facility = self.parse_facility_data(facility_data)
-                        facility_key = f"{facility.facility_name}_{facility.address_line1}".lower()
+            city_results = await asyncio.gather(*(
+                search(state=state, city=city)
+                for city in major_cities[state]
+                for search in (self.search_facilities_api, self.search_facilities_web)
+            ))
+            
+            for results in city_results:
+                for facility_data in results:
+                    facility = self.parse_inpatient_facility(facility_data)
+                    if facility is not None:
+                        facility_key = facility.dedup_key
                         
-                        if facility_key not in unique_facilities:
-                            unique_facilities[facility_key] = facility
+                        if facility_key not in seen_keys:
+                            seen_keys.add(facility_key)
                             facilities.append(facility)
         
         logger.info(f"Extracted {len(facilities)} inpatient facilities from {state}")
         return facilities
     
-    def extract_all_states(self) -> List[InpatientFacility]:
+    async def extract_all_states(self) -> List[InpatientFacility]:
         """Extract inpatient facilities from all US states."""
         logger.info("Starting comprehensive extraction of inpatient facilities from all states")
         
         all_facilities = []
         
-        for state in self.us_states:
+        # Every state is fetched concurrently over one session; the request
+        # semaphore and rate limiter replace the fixed sleeps between states
+        async with self.open_session() as session:
+            self.session = session
             try:
-                state_facilities = self.extract_state_facilities(state)
-                all_facilities.extend(state_facilities)
-                
-                # Rate limiting between states
-                time.sleep(random.uniform(5, 10))
+                # Fetch the state-level API results ten states per request
+                # when the API supports it
+                api_results_by_state = {}
+                if await self.probe_state_batching():
+                    api_results_by_state = await self.search_states_in_batches()
                 
-            except Exception as e:
-                logger.error(f"Error extracting facilities from {state}: {e}")
+                results = await asyncio.gather(
+                    *(self.extract_state_facilities(state, api_results_by_state.get(state))
+                      for state in self.us_states),
+                    return_exceptions=True
+                )
+            finally:
+                self.session = None
+        
+        for state, state_facilities in zip(self.us_states, results):
+            if isinstance(state_facilities, Exception):
+                logger.error(f"Error extracting facilities from {state}: {state_facilities}")
                 continue
+            all_facilities.extend(state_facilities)
         
         logger.info(f"Total inpatient facilities extracted: {len(all_facilities)}")
         return all_facilities
     
-    def enhance_with_medicare_data(self, facilities: List[InpatientFacility]) -> List[InpatientFacility]:
-        """Enhance facility data with Medicare provider information if available."""
-        logger.info("Attempting to enhance facility data with Medicare information")
-        
-        # This would connect to Medicare provider directories if available
-        # For now, we'll mark facilities that likely accept Medicare based on hospital status
-        for facility in facilities:
-            if any(term in facility.facility_name.lower() for term in ['hospital', 'medical center']):
-                if not facility.medicare_accepted:
-                    facility.medicare_accepted = True
-                if not facility.medicaid_accepted:
-                    facility.medicaid_accepted = True
+    def build_extraction_metadata(self, facilities: List[InpatientFacility]) -> Dict[str, Any]:
+        """Build the extraction_metadata section saved alongside the facilities."""
+        return {
+            "extraction_date": datetime.now().isoformat(),
+            "total_facilities": len(facilities),
+            "data_source": "SAMHSA Treatment Locator",
+            "extraction_method": "API/Web Scraping Hybrid",
+            "service_types_targeted": [
+                "Hospital inpatient detoxification",
+                "Medical detox units",
+                "Psychiatric hospitals with addiction units",
+                "Dual diagnosis inpatient",
+                "Medical stabilization",
+                "ASAM Level 4 facilities",
+                "Acute care addiction units",
+                "Emergency detox services"
+            ],
+            "facility_types": [
+                "General hospitals with addiction units",
+                "Psychiatric hospitals",
+                "Specialty addiction hospitals",
+                "VA medical centers",
+                "University medical centers",
+                "Private hospital systems"
+            ],
+            "geographic_coverage": "All US States and Territories"
+        }
+    
+    def save_to_ndjson(self, facilities: List[InpatientFacility], filepath: str):
+        """Stream facilities to a JSON Lines file, one facility per line.
         
-        return facilities
+        The extraction metadata goes to a sibling .meta.json file.
+        """
+        try:
+            # Ensure directory exists
+            os.makedirs(os.path.dirname(filepath), exist_ok=True)
+            
+            with open(filepath, 'wb') as f:
+                for facility in facilities:
+                    f.write(orjson.dumps(facility.to_dict()))
+                    f.write(b"\n")
+            
+            metadata_path = os.path.splitext(filepath)[0] + '.meta.json'
+            with open(metadata_path, 'wb') as f:
+                f.write(orjson.dumps({"extraction_metadata": self.build_extraction_metadata(facilities)},
+                                     option=orjson.OPT_INDENT_2))
+            
+            logger.info(f"Saved {len(facilities)} facilities to {filepath}")
+            
+        except Exception as e:
+            logger.error(f"Error saving data to {filepath}: {e}")
     
     def save_to_json(self, facilities: List[InpatientFacility], filepath: str):
-        """Save facilities data to JSON file."""
+        """Save facilities data to a single JSON document (extraction_metadata and facilities)."""
         try:
-            # Convert facilities to dictionaries
-            facilities_data = []
-            for facility in facilities:
-                facility_dict = asdict(facility)
-                facilities_data.append(facility_dict)
-            
             # Create output structure
             output_data = {
-                "extraction_metadata": {
-                    "extraction_date": datetime.now().isoformat(),
-                    "total_facilities": len(facilities_data),
-                    "data_source": "SAMHSA Treatment Locator",
-                    "extraction_method": "API/Web Scraping Hybrid",
-                    "service_types_targeted": [
-                        "Hospital inpatient detoxification",
-                        "Medical detox units",
-                        "Psychiatric hospitals with addiction units",
-                        "Dual diagnosis inpatient",
-                        "Medical stabilization",
-                        "ASAM Level 4 facilities",
-                        "Acute care addiction units",
-                        "Emergency detox services"
-                    ],
-                    "facility_types": [
-                        "General hospitals with addiction units",
-                        "Psychiatric hospitals",
-                        "Specialty addiction hospitals",
-                        "VA medical centers",
-                        "University medical centers",
-                        "Private hospital systems"
-                    ],
-                    "geographic_coverage": "All US States and Territories"
-                },
-                "facilities": facilities_data
+                "extraction_metadata": self.build_extraction_metadata(facilities),
+                "facilities": [facility.to_dict() for facility in facilities]
             }
             
             # Ensure directory exists
             os.makedirs(os.path.dirname(filepath), exist_ok=True)
             
             # Save to file
-            with open(filepath, 'w', encoding='utf-8') as f:
-                json.dump(output_data, f, indent=2, ensure_ascii=False)
+            with open(filepath, 'wb') as f:
+                f.write(orjson.dumps(output_data, option=orjson.OPT_INDENT_2))
             
-            logger.info(f"Saved {len(facilities_data)} facilities to {filepath}")
+            logger.info(f"Saved {len(facilities)} facilities to {filepath}")
             
         except Exception as e:
             logger.error(f"Error saving data to {filepath}: {e}")
@@ -669,19 +1011,16 @@ class SAMHSAInpatientExtractor:
     def run_extraction(self, output_path: str = None) -> str:
         """Run the complete extraction process."""
         if output_path is None:
-            output_path = "/Users/benweiss/Code/narr_extractor/03_raw_data/treatment_centers/inpatient/samhsa/samhsa_inpatient_facilities.json"
+            output_path = "/Users/benweiss/Code/narr_extractor/03_raw_data/treatment_centers/inpatient/samhsa/samhsa_inpatient_facilities.jsonl"
         
         logger.info("Starting SAMHSA inpatient/hospital-based treatment centers extraction")
         
         try:
             # Extract facilities from all states
-            facilities = self.extract_all_states()
-            
-            # Enhance with additional data sources
-            facilities = self.enhance_with_medicare_data(facilities)
+            facilities = asyncio.run(self.extract_all_states())
             
-            # Save to JSON
-            self.save_to_json(facilities, output_path)
+            # Stream to JSON Lines
+            self.save_to_ndjson(facilities, output_path)
             
             logger.info(f"Extraction completed successfully. Total facilities: {len(facilities)}")
             return output_path
@@ -12,19 +12,21 @@ Author: Claude Code
 Date: 2025-07-31
 """
 
-import requests
-from bs4 import BeautifulSoup
-import json
-import time
+import asyncio
+import aiohttp
+from concurrent.futures import ProcessPoolExecutor
+from selectolax.lexbor import LexborCSSSelector, LexborHTMLParser, LexborNode
+import orjson
 import logging
-from typing import Dict, List, Optional, Any, Tuple
+from typing import Dict, List, Optional, Any, Set, Tuple
+from collections import defaultdict
 from dataclasses import dataclass, asdict
 import os
 from datetime import datetime
 import re
-import random
+import time
 from urllib.parse import urlencode, urljoin, urlparse
-import hashlib
+import xxhash
 
 # Configure logging
 logging.basicConfig(
@@ -37,7 +39,71 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
-@dataclass
+# Inpatient/hospital keywords
+HOSPITAL_KEYWORDS = [
+    'hospital', 'medical center', 'health center', 'medical', 
+    'behavioral health center', 'psychiatric hospital'
+]
+
+INPATIENT_KEYWORDS = [
+    'inpatient', 'detox', 'detoxification', 'medical detox',
+    'hospital', 'acute', 'crisis', '24 hour', '24-hour',
+    'residential hospital', 'medically managed', 'medically monitored'
+]
+
+# Keyword lists compiled to alternations: one search per text instead of
+# one substring scan per keyword
+HOSPITAL_RE = re.compile('|'.join(map(re.escape, HOSPITAL_KEYWORDS)))
+INPATIENT_RE = re.compile('|'.join(map(re.escape, INPATIENT_KEYWORDS)))
+
+# Embedded JSON result blobs, tried in order
+JSON_PATTERNS = [
+    re.compile(pattern, re.DOTALL) for pattern in (
+        r'window\.__INITIAL_STATE__\s*=\s*({.*?});',
+        r'window\.searchResults\s*=\s*(\[.*?\]);',
+        r'"facilities":\s*(\[.*?\])',
+        r'data:\s*(\[.*?\])'
+    )
+]
+
+# Statuses worth retrying: rate limiting and transient server errors
+RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+
+# Result container and field selectors, each tried in priority order
+RESULT_SELECTORS = (
+    '.facility-result',
+    '.search-result',
+    '.treatment-facility',
+    '[class*="facility"]',
+    '[class*="result"]',
+    '.listing',
+    'article'
+)
+NAME_SELECTORS = ('.facility-name', '.name', 'h2', 'h3', '.title', '[class*="name"]')
+ADDRESS_SELECTORS = ('.address', '.location', '[class*="address"]')
+PHONE_SELECTORS = ('.phone', '.tel', '[class*="phone"]', 'a[href^="tel:"]')
+SERVICES_SELECTORS = ('.services', '.treatment-types', '[class*="service"]')
+
+# One selector engine reused for every lookup; node.css() sets up a new one
+# per call
+_CSS_SELECTOR = LexborCSSSelector()
+
+def select_one(element: LexborNode, selector: str) -> Optional[LexborNode]:
+    """First descendant of element matching selector.
+    
+    Lexbor matches the element itself as well; skip it so lookups only see
+    what is inside the result element.
+    """
+    matches = _CSS_SELECTOR.find_first(selector, element)
+    if not matches:
+        return None
+    if matches[0] != element:
+        return matches[0]
+    # The element itself comes first in document order; take the next match
+    matches = _CSS_SELECTOR.find(selector, element)
+    return matches[1] if len(matches) > 1 else None
+
+@dataclass(slots=True)
 class HospitalFacility:
     """Data structure for hospital-based treatment facility information."""
     
@@ -83,16 +149,280 @@ class HospitalFacility:
         if self.extraction_date == "":
             self.extraction_date = datetime.now().isoformat()
 
+def parse_search_results(html_content: str, state: str) -> List[HospitalFacility]:
+    """Parse search results from HTML content."""
+    facilities = []
+    
+    try:
+        tree = LexborHTMLParser(html_content)
+        
+        # Look for different possible result containers
+        result_elements = []
+        for selector in RESULT_SELECTORS:
+            elements = tree.css(selector)
+            if elements:
+                result_elements = elements
+                logger.info(f"Found {len(elements)} results with selector: {selector}")
+                break
+        
+        # Also check for JSON data in script tags
+        script_tags = tree.css('script[type="application/json"], script[type="text/javascript"]')
+        for script in script_tags:
+            script_text = script.text()
+            if script_text and ('facilities' in script_text or 'results' in script_text):
+                try:
+                    # Extract JSON from various patterns
+                    for pattern in JSON_PATTERNS:
+                        match = pattern.search(script_text)
+                        if match:
+                            json_str = match.group(1)
+                            data = orjson.loads(json_str)
+                            
+                            if isinstance(data, list):
+                                for item in data:
+                                    facility = parse_json_facility(item, state)
+                                    if facility and is_hospital_facility(facility):
+                                        facilities.append(facility)
+                            elif isinstance(data, dict):
+                                if 'facilities' in data:
+                                    for item in data['facilities']:
+                                        facility = parse_json_facility(item, state)
+                                        if facility and is_hospital_facility(facility):
+                                            facilities.append(facility)
+                            break
+                except Exception as e:
+                    logger.debug(f"Failed to parse JSON from script: {e}")
+        
+        # Parse HTML elements
+        for element in result_elements:
+            facility = parse_facility_element(element, state)
+            if facility and is_hospital_facility(facility):
+                facilities.append(facility)
+        
+        # Look for data attributes
+        data_elements = tree.css('[data-facility]')
+        for elem in data_elements:
+            try:
+                facility_data = orjson.loads(elem.attributes.get('data-facility'))
+                facility = parse_json_facility(facility_data, state)
+                if facility and is_hospital_facility(facility):
+                    facilities.append(facility)
+            except:
+                pass
+        
+    except Exception as e:
+        logger.error(f"Error parsing search results: {e}")
+    
+    return facilities
+
+def parse_facility_element(element: LexborNode, state: str) -> Optional[HospitalFacility]:
+    """Parse facility from HTML element."""
+    try:
+        facility = HospitalFacility(state=state)
+        
+        # Extract name
+        for selector in NAME_SELECTORS:
+            name_elem = select_one(element, selector)
+            if name_elem:
+                facility.facility_name = name_elem.text(strip=True)
+                break
+        
+        if not facility.facility_name:
+            return None
+        
+        # Extract address
+        for selector in ADDRESS_SELECTORS:
+            addr_elem = select_one(element, selector)
+            if addr_elem:
+                addr_text = addr_elem.text(strip=True)
+                facility.street_address = addr_text.split(',')[0] if ',' in addr_text else addr_text
+                break
+        
+        # Extract phone
+        for selector in PHONE_SELECTORS:
+            phone_elem = select_one(element, selector)
+            if phone_elem:
+                href = phone_elem.attributes.get('href') or ''
+                if phone_elem.tag == 'a' and href.startswith('tel:'):
+                    facility.phone = href.replace('tel:', '')
+                else:
+                    facility.phone = phone_elem.text(strip=True)
+                break
+        
+        # Extract services
+        for selector in SERVICES_SELECTORS:
+            services_elem = select_one(element, selector)
+            if services_elem:
+                services_text = services_elem.text(strip=True)
+                facility.services = [s.strip() for s in re.split('[,;]', services_text)]
+                break
+        
+        # Check if it's a hospital
+        all_text = element.text().lower()
+        facility.is_hospital = HOSPITAL_RE.search(all_text) is not None
+        # 'detoxification' contains 'detox', so one substring test covers both
+        facility.has_detox = 'detox' in all_text
+        facility.has_medical_detox = 'medical detox' in all_text or 'medically' in all_text
+        
+        return facility
+        
+    except Exception as e:
+        logger.error(f"Error parsing facility element: {e}")
+        return None
+
+def parse_json_facility(data: Dict, state: str) -> Optional[HospitalFacility]:
+    """Parse facility from JSON data."""
+    try:
+        facility = HospitalFacility(state=state)
+        
+        # Map common field names, in priority order
+        facility.facility_name = (data.get('name') or data.get('facilityName') or data.get('title')
+                                  or data.get('providerName') or '')
+        
+        if not facility.facility_name:
+            return None
+        
+        # Address
+        if 'address' in data:
+            addr = data['address']
+            if isinstance(addr, dict):
+                facility.street_address = addr.get('street', addr.get('line1', ''))
+                facility.city = addr.get('city', '')
+                facility.zip_code = addr.get('zip', addr.get('postalCode', ''))
+            elif isinstance(addr, str):
+                facility.street_address = addr
+        
+        # Phone
+        facility.phone = data.get('phone') or data.get('telephone') or data.get('contactPhone') or ''
+        
+        # Services
+        if 'services' in data:
+            if isinstance(data['services'], list):
+                facility.services = data['services']
+            elif isinstance(data['services'], str):
+                facility.services = [data['services']]
+        
+        # Check for inpatient services
+        services_text = ' '.join(facility.services).lower() if facility.services else ''
+        name_lower = facility.facility_name.lower()
+        
+        facility.is_hospital = (HOSPITAL_RE.search(name_lower) is not None
+                                or HOSPITAL_RE.search(services_text) is not None)
+        facility.has_detox = 'detox' in services_text or 'DT' in data.get('serviceCodes', [])
+        facility.has_medical_detox = 'medical detox' in services_text
+        
+        # Insurance
+        if 'insurance' in data:
+            ins = data['insurance']
+            if isinstance(ins, dict):
+                facility.accepts_medicaid = ins.get('medicaid', False)
+                facility.accepts_medicare = ins.get('medicare', False)
+                facility.accepts_private_insurance = ins.get('private', False)
+        
+        return facility
+        
+    except Exception as e:
+        logger.error(f"Error parsing JSON facility: {e}")
+        return None
+
+def is_hospital_facility(facility: HospitalFacility) -> bool:
+    """Check if facility is a hospital or inpatient facility."""
+    # Flags set while parsing settle most facilities without any text work
+    if facility.is_hospital or facility.has_detox:
+        return True
+    
+    # Check name
+    if HOSPITAL_RE.search(facility.facility_name.lower()) is not None:
+        return True
+    
+    # Check services
+    if not facility.services:
+        return False
+    services_text = ' '.join(facility.services).lower()
+    return INPATIENT_RE.search(services_text) is not None
+
+def parse_search_page(html_content: str, state: str) -> List[Dict[str, Any]]:
+    """Process-pool entry point: parse a results page into plain facility dicts."""
+    return [asdict(f) for f in parse_search_results(html_content, state)]
+
+class RateLimiter:
+    """Token bucket bounding the aggregate request rate of concurrent tasks.
+    
+    The rate adapts to the server: throttle() halves it and holds requests
+    back for any Retry-After, while every success_window consecutive
+    successes raise it by rate_step, up to max_rate.
+    """
+    
+    def __init__(self, rate: float, burst: int = 1, min_rate: float = 0.25,
+                 max_rate: Optional[float] = None, rate_step: float = 0.5,
+                 success_window: int = 20):
+        self.rate = rate
+        self.burst = burst
+        self.min_rate = min_rate
+        self.max_rate = rate if max_rate is None else max_rate
+        self.rate_step = rate_step
+        self.success_window = success_window
+        self._tokens = float(burst)
+        self._updated = time.monotonic()
+        self._successes = 0
+        self._lock = asyncio.Lock()
+    
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+    
+    async def acquire(self):
+        """Wait until another request may be sent."""
+        # Waiters queue on the lock, so tokens go out in arrival order
+        async with self._lock:
+            self._refill()
+            while self._tokens < 1:
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+                self._refill()
+            self._tokens -= 1
+    
+    def record_success(self):
+        """Count a successful response; a full window of them raises the rate."""
+        self._successes += 1
+        if self._successes >= self.success_window:
+            self._successes = 0
+            self.rate = min(self.max_rate, self.rate + self.rate_step)
+    
+    def throttle(self, retry_after: float = 0.0):
+        """Back off after the server pushed back (429, Retry-After)."""
+        self._refill()
+        self._successes = 0
+        self.rate = max(self.min_rate, self.rate / 2)
+        # Drain the bucket, going into debt for the Retry-After period
+        self._tokens = min(0.0, self._tokens) - retry_after * self.rate
+
 class SAMHSAWebExtractor:
     """Enhanced web scraper for SAMHSA inpatient facilities."""
     
     def __init__(self):
         """Initialize the web scraper."""
         self.base_url = "https://findtreatment.gov"
-        self.session = requests.Session()
+        self.session: Optional[aiohttp.ClientSession] = None
+        
+        # States searched at once; each state's requests stay sequential
+        self.max_concurrent_states = 16
+        
+        # Result pages are parsed in worker processes, off the event loop
+        self.parse_pool: Optional[ProcessPoolExecutor] = None
+        
+        # Requests start at rate_limiter's pace across all states; it speeds
+        # up while the server keeps answering and backs off when it pushes back
+        self.rate_limiter = RateLimiter(rate=1, burst=3, max_rate=5)
+        
+        # Transient failures (RETRY_STATUSES, connection errors) are retried;
+        # server errors with exponential backoff, retry_backoff * 2 ** attempt
+        # seconds, and rate limiting through the rate limiter
+        self.max_retries = 5
+        self.retry_backoff = 0.5
         
         # Set headers to mimic a real browser
-        self.session.headers.update({
+        self.headers = {
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
             'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
             'Accept-Language': 'en-US,en;q=0.9',
@@ -100,11 +430,14 @@ class SAMHSAWebExtractor:
             'DNT': '1',
             'Connection': 'keep-alive',
             'Upgrade-Insecure-Requests': '1'
-        })
+        }
         
-        self.facilities = []
+        # Unique facilities in discovery order, indexed by state; the seen
+        # hashes are all deduplication needs to keep
+        self.facilities: List[HospitalFacility] = []
         self.extracted_count = 0
-        self.unique_facilities = {}
+        self._seen_hashes: Set[int] = set()
+        self._by_state: Dict[str, List[HospitalFacility]] = defaultdict(list)
         
         # State list
         self.states = [
@@ -115,18 +448,6 @@ class SAMHSAWebExtractor:
             'SD', 'TN', 'TX', 'UT', 'VT', 'VA', 'WA', 'WV', 'WI', 'WY', 'DC'
         ]
         
-        # Inpatient/hospital keywords
-        self.hospital_keywords = [
-            'hospital', 'medical center', 'health center', 'medical', 
-            'behavioral health center', 'psychiatric hospital'
-        ]
-        
-        self.inpatient_keywords = [
-            'inpatient', 'detox', 'detoxification', 'medical detox',
-            'hospital', 'acute', 'crisis', '24 hour', '24-hour',
-            'residential hospital', 'medically managed', 'medically monitored'
-        ]
-        
         self.service_codes = {
             'DT': 'Detoxification',
             'HI': 'Hospital inpatient',
@@ -135,12 +456,65 @@ class SAMHSAWebExtractor:
             'MD': 'Medically monitored'
         }
     
-    def get_facility_hash(self, name: str, address: str) -> str:
+    def get_facility_hash(self, name: str, address: str) -> int:
         """Generate unique hash for facility deduplication."""
-        combined = f"{name.lower().strip()}_{address.lower().strip()}"
-        return hashlib.md5(combined.encode()).hexdigest()
+        # Case-fold the joined key once; strip() returns its input unchanged
+        # when there is nothing to trim
+        combined = f"{name.strip()}_{address.strip()}".lower()
+        return xxhash.xxh3_64_intdigest(combined.encode())
+    
+    def open_session(self) -> aiohttp.ClientSession:
+        """Create the pooled HTTP session shared by all requests of a run."""
+        connector = aiohttp.TCPConnector(limit=64, limit_per_host=8, keepalive_timeout=60)
+        timeout = aiohttp.ClientTimeout(total=30)
+        return aiohttp.ClientSession(connector=connector, timeout=timeout, headers=self.headers)
+    
+    async def fetch(self, url: str, form: Optional[Dict[str, Any]] = None) -> Optional[str]:
+        """GET url, or POST form to it when given; returns the body of a 200 response, else None.
+        
+        Transient failures are retried up to max_retries times, honouring a
+        numeric Retry-After; connection errors are raised once retries run out.
+        """
+        for attempt in range(self.max_retries + 1):
+            await self.rate_limiter.acquire()
+            if form is None:
+                request = self.session.get(url)
+            else:
+                request = self.session.post(url, data=urlencode(form, doseq=True),
+                                            headers={'Content-Type': 'application/x-www-form-urlencoded'})
+            
+            status = None
+            retry_after = None
+            try:
+                async with request as response:
+                    if response.status == 200:
+                        self.rate_limiter.record_success()
+                        return await response.text()
+                    if response.status not in RETRY_STATUSES:
+                        return None
+                    status = response.status
+                    retry_after = response.headers.get('Retry-After')
+            except (aiohttp.ClientError, asyncio.TimeoutError):
+                if attempt == self.max_retries:
+                    raise
+            
+            if attempt < self.max_retries:
+                retry_after = int(retry_after) if retry_after and retry_after.isdigit() else None
+                if status == 429 or retry_after is not None:
+                    # The next acquire() waits out the server's request
+                    self.rate_limiter.throttle(retry_after or 0)
+                else:
+                    await asyncio.sleep(self.retry_backoff * 2 ** attempt)
+        
+        return None
+    
+    async def parse_page(self, html_content: str, state: str) -> List[HospitalFacility]:
+        """Parse a results page in the process pool."""
+        loop = asyncio.get_running_loop()
+        records = await loop.run_in_executor(self.parse_pool, parse_search_page, html_content, state)
+        return [HospitalFacility(**record) for record in records]
     
-    def extract_via_direct_search(self, state: str) -> List[HospitalFacility]:
+    async def extract_via_direct_search(self, state: str) -> List[HospitalFacility]:
         """Extract facilities by directly accessing the search page with parameters."""
         facilities = []
         
@@ -156,10 +530,9 @@ class SAMHSAWebExtractor:
                 logger.info(f"Trying search URL: {search_url} for state {state}")
                 
                 # First, get the main page to establish session
-                response = self.session.get(search_url)
-                time.sleep(1)
+                page = await self.fetch(search_url)
                 
-                if response.status_code != 200:
+                if page is None:
                     continue
                 
                 # Try to submit search with parameters
@@ -174,12 +547,15 @@ class SAMHSAWebExtractor:
                 
                 # Try GET request with parameters
                 full_url = f"{search_url}?{urlencode(search_params, doseq=True)}"
-                response = self.session.get(full_url)
+                page = await self.fetch(full_url)
                 
-                if response.status_code == 200:
-                    facilities.extend(self.parse_search_results(response.text, state))
-                    
-                # Also try POST request
+                if page is not None:
+                    facilities.extend(await self.parse_page(page, state))
+                
+                if facilities:
+                    break
+                
+                # Fall back to a POST request only when the GET found nothing
                 post_data = {
                     'searchLocation': state,
                     'selectedState': state,
@@ -188,258 +564,45 @@ class SAMHSAWebExtractor:
                     'services': ['Detoxification', 'Hospital inpatient']
                 }
                 
-                response = self.session.post(search_url, data=post_data)
-                if response.status_code == 200:
-                    facilities.extend(self.parse_search_results(response.text, state))
+                page = await self.fetch(search_url, form=post_data)
+                if page is not None:
+                    facilities.extend(await self.parse_page(page, state))
                 
                 if facilities:
                     break
                 
-                time.sleep(random.uniform(1, 3))
-                
         except Exception as e:
             logger.error(f"Error in direct search for {state}: {e}")
         
         return facilities
     
-    def parse_search_results(self, html_content: str, state: str) -> List[HospitalFacility]:
-        """Parse search results from HTML content."""
-        facilities = []
-        
-        try:
-            soup = BeautifulSoup(html_content, 'html.parser')
-            
-            # Look for different possible result containers
-            result_selectors = [
-                '.facility-result',
-                '.search-result',
-                '.treatment-facility',
-                '[class*="facility"]',
-                '[class*="result"]',
-                '.listing',
-                'article'
-            ]
-            
-            result_elements = []
-            for selector in result_selectors:
-                elements = soup.select(selector)
-                if elements:
-                    result_elements = elements
-                    logger.info(f"Found {len(elements)} results with selector: {selector}")
-                    break
-            
-            # Also check for JSON data in script tags
-            script_tags = soup.find_all('script', type=['application/json', 'text/javascript'])
-            for script in script_tags:
-                if script.string and ('facilities' in script.string or 'results' in script.string):
-                    try:
-                        # Extract JSON from various patterns
-                        json_patterns = [
-                            r'window\.__INITIAL_STATE__\s*=\s*({.*?});',
-                            r'window\.searchResults\s*=\s*(\[.*?\]);',
-                            r'"facilities":\s*(\[.*?\])',
-                            r'data:\s*(\[.*?\])'
-                        ]
-                        
-                        for pattern in json_patterns:
-                            match = re.search(pattern, script.string, re.DOTALL)
-                            if match:
-                                json_str = match.group(1)
-                                data = json.loads(json_str)
-                                
-                                if isinstance(data, list):
-                                    for item in data:
-                                        facility = self.parse_json_facility(item, state)
-                                        if facility and self.is_hospital_facility(facility):
-                                            facilities.append(facility)
-                                elif isinstance(data, dict):
-                                    if 'facilities' in data:
-                                        for item in data['facilities']:
-                                            facility = self.parse_json_facility(item, state)
-                                            if facility and self.is_hospital_facility(facility):
-                                                facilities.append(facility)
-                                break
-                    except Exception as e:
-                        logger.debug(f"Failed to parse JSON from script: {e}")
-            
-            # Parse HTML elements
-            for element in result_elements:
-                facility = self.parse_facility_element(element, state)
-                if facility and self.is_hospital_facility(facility):
-                    facilities.append(facility)
-            
-            # Look for data attributes
-            data_elements = soup.find_all(attrs={'data-facility': True})
-            for elem in data_elements:
-                try:
-                    facility_data = json.loads(elem.get('data-facility'))
-                    facility = self.parse_json_facility(facility_data, state)
-                    if facility and self.is_hospital_facility(facility):
-                        facilities.append(facility)
-                except:
-                    pass
-            
-        except Exception as e:
-            logger.error(f"Error parsing search results: {e}")
-        
-        return facilities
-    
-    def parse_facility_element(self, element, state: str) -> Optional[HospitalFacility]:
-        """Parse facility from HTML element."""
-        try:
-            facility = HospitalFacility(state=state)
-            
-            # Extract name
-            name_selectors = ['.facility-name', '.name', 'h2', 'h3', '.title', '[class*="name"]']
-            for selector in name_selectors:
-                name_elem = element.select_one(selector)
-                if name_elem:
-                    facility.facility_name = name_elem.get_text(strip=True)
-                    break
-            
-            if not facility.facility_name:
-                return None
-            
-            # Extract address
-            address_selectors = ['.address', '.location', '[class*="address"]']
-            for selector in address_selectors:
-                addr_elem = element.select_one(selector)
-                if addr_elem:
-                    addr_text = addr_elem.get_text(strip=True)
-                    facility.street_address = addr_text.split(',')[0] if ',' in addr_text else addr_text
-                    break
-            
-            # Extract phone
-            phone_selectors = ['.phone', '.tel', '[class*="phone"]', 'a[href^="tel:"]']
-            for selector in phone_selectors:
-                phone_elem = element.select_one(selector)
-                if phone_elem:
-                    if phone_elem.name == 'a' and phone_elem.get('href', '').startswith('tel:'):
-                        facility.phone = phone_elem.get('href').replace('tel:', '')
-                    else:
-                        facility.phone = phone_elem.get_text(strip=True)
-                    break
-            
-            # Extract services
-            services_selectors = ['.services', '.treatment-types', '[class*="service"]']
-            for selector in services_selectors:
-                services_elem = element.select_one(selector)
-                if services_elem:
-                    services_text = services_elem.get_text(strip=True)
-                    facility.services = [s.strip() for s in re.split('[,;]', services_text)]
-                    break
-            
-            # Check if it's a hospital
-            all_text = element.get_text().lower()
-            facility.is_hospital = any(keyword in all_text for keyword in self.hospital_keywords)
-            facility.has_detox = 'detox' in all_text or 'detoxification' in all_text
-            facility.has_medical_detox = 'medical detox' in all_text or 'medically' in all_text
-            
-            return facility
-            
-        except Exception as e:
-            logger.error(f"Error parsing facility element: {e}")
-            return None
-    
-    def parse_json_facility(self, data: Dict, state: str) -> Optional[HospitalFacility]:
-        """Parse facility from JSON data."""
-        try:
-            facility = HospitalFacility(state=state)
-            
-            # Map common field names
-            name_fields = ['name', 'facilityName', 'title', 'providerName']
-            for field in name_fields:
-                if field in data:
-                    facility.facility_name = data[field]
-                    break
-            
-            if not facility.facility_name:
-                return None
-            
-            # Address
-            if 'address' in data:
-                addr = data['address']
-                if isinstance(addr, dict):
-                    facility.street_address = addr.get('street', addr.get('line1', ''))
-                    facility.city = addr.get('city', '')
-                    facility.zip_code = addr.get('zip', addr.get('postalCode', ''))
-                elif isinstance(addr, str):
-                    facility.street_address = addr
-            
-            # Phone
-            phone_fields = ['phone', 'telephone', 'contactPhone']
-            for field in phone_fields:
-                if field in data:
-                    facility.phone = data[field]
-                    break
-            
-            # Services
-            if 'services' in data:
-                if isinstance(data['services'], list):
-                    facility.services = data['services']
-                elif isinstance(data['services'], str):
-                    facility.services = [data['services']]
-            
-            # Check for inpatient services
-            services_text = ' '.join(facility.services).lower() if facility.services else ''
-            name_lower = facility.facility_name.lower()
-            
-            facility.is_hospital = any(kw in name_lower or kw in services_text 
-                                     for kw in self.hospital_keywords)
-            facility.has_detox = 'detox' in services_text or 'DT' in data.get('serviceCodes', [])
-            facility.has_medical_detox = 'medical detox' in services_text
-            
-            # Insurance
-            if 'insurance' in data:
-                ins = data['insurance']
-                if isinstance(ins, dict):
-                    facility.accepts_medicaid = ins.get('medicaid', False)
-                    facility.accepts_medicare = ins.get('medicare', False)
-                    facility.accepts_private_insurance = ins.get('private', False)
-            
-            return facility
-            
-        except Exception as e:
-            logger.error(f"Error parsing JSON facility: {e}")
-            return None
-    
-    def is_hospital_facility(self, facility: HospitalFacility) -> bool:
-        """Check if facility is a hospital or inpatient facility."""
-        # Check name
-        name_lower = facility.facility_name.lower()
-        has_hospital_name = any(kw in name_lower for kw in self.hospital_keywords)
-        
-        # Check services
-        services_text = ' '.join(facility.services).lower() if facility.services else ''
-        has_inpatient_service = any(kw in services_text for kw in self.inpatient_keywords)
-        
-        # Must be hospital or have inpatient services
-        return facility.is_hospital or has_hospital_name or has_inpatient_service or facility.has_detox
-    
-    def extract_state_facilities(self, state: str) -> List[HospitalFacility]:
+    async def extract_state_facilities(self, state: str) -> List[HospitalFacility]:
         """Extract all hospital/inpatient facilities for a state."""
         logger.info(f"Extracting hospital facilities for {state}")
         
         facilities = []
         
         # Try direct search
-        facilities.extend(self.extract_via_direct_search(state))
+        facilities.extend(await self.extract_via_direct_search(state))
         
         # Try alternative Medicare/hospital databases
         facilities.extend(self.search_medicare_hospitals(state))
         
-        # Deduplicate
+        # Deduplicate: one set probe on the 64-bit key digest per facility
         for facility in facilities:
             if facility.facility_name and facility.street_address:
                 facility_hash = self.get_facility_hash(facility.facility_name, facility.street_address)
-                if facility_hash not in self.unique_facilities:
-                    self.unique_facilities[facility_hash] = facility
-                    self.extracted_count += 1
+                if facility_hash in self._seen_hashes:
+                    continue
+                self._seen_hashes.add(facility_hash)
+                self._by_state[facility.state].append(facility)
+                self.facilities.append(facility)
+                self.extracted_count += 1
         
-        unique_count = len([f for f in self.unique_facilities.values() if f.state == state])
-        logger.info(f"Found {unique_count} unique hospital facilities in {state}")
+        state_facilities = self._by_state[state]
+        logger.info(f"Found {len(state_facilities)} unique hospital facilities in {state}")
         
-        return [f for f in self.unique_facilities.values() if f.state == state]
+        return state_facilities
     
     def search_medicare_hospitals(self, state: str) -> List[HospitalFacility]:
         """Search Medicare hospital database for addiction treatment facilities."""
@@ -452,59 +615,75 @@ class SAMHSAWebExtractor:
         
         return facilities
     
-    def extract_all_states(self) -> List[HospitalFacility]:
-        """Extract facilities from all states."""
-        all_facilities = []
-        
-        for i, state in enumerate(self.states):
-            logger.info(f"Processing state {i+1}/{len(self.states)}: {state}")
+    async def extract_state_in_slot(self, index: int, state: str,
+                                    state_slots: asyncio.Semaphore) -> List[HospitalFacility]:
+        """Extract one state while holding one of the concurrent state slots."""
+        async with state_slots:
+            logger.info(f"Processing state {index+1}/{len(self.states)}: {state}")
             
             try:
-                state_facilities = self.extract_state_facilities(state)
-                all_facilities.extend(state_facilities)
-                
-                # Rate limiting
-                time.sleep(random.uniform(3, 6))
-                
+                return await self.extract_state_facilities(state)
             except Exception as e:
                 logger.error(f"Error processing {state}: {e}")
-                continue
+                return []
+    
+    async def extract_all_states(self) -> List[HospitalFacility]:
+        """Extract facilities from all states."""
+        state_slots = asyncio.Semaphore(self.max_concurrent_states)
         
-        return list(self.unique_facilities.values())
+        # States are fetched concurrently over one session while worker
+        # processes parse the pages already received
+        with ProcessPoolExecutor(max_workers=os.cpu_count()) as parse_pool:
+            async with self.open_session() as session:
+                self.session = session
+                self.parse_pool = parse_pool
+                try:
+                    await asyncio.gather(*(self.extract_state_in_slot(i, state, state_slots)
+                                           for i, state in enumerate(self.states)))
+                finally:
+                    self.session = None
+                    self.parse_pool = None
+        
+        return self.facilities
     
     def save_results(self, facilities: List[HospitalFacility], output_path: str):
-        """Save extracted facilities to JSON."""
+        """Save extracted facilities as JSON Lines, one facility per line.
+        
+        The extraction metadata goes to a sibling .meta.json file.
+        """
         try:
-            # Convert to dictionaries
-            facilities_data = [asdict(f) for f in facilities]
-            
-            output = {
-                "extraction_metadata": {
-                    "extraction_date": datetime.now().isoformat(),
-                    "total_facilities": len(facilities_data),
-                    "states_processed": self.states,
-                    "extraction_method": "Web Scraping",
-                    "data_sources": [
-                        "SAMHSA FindTreatment.gov",
-                        "Direct web scraping"
-                    ]
-                },
-                "facilities": facilities_data
+            metadata = {
+                "extraction_date": datetime.now().isoformat(),
+                "total_facilities": len(facilities),
+                "states_processed": self.states,
+                "extraction_method": "Web Scraping",
+                "data_sources": [
+                    "SAMHSA FindTreatment.gov",
+                    "Direct web scraping"
+                ]
             }
             
             os.makedirs(os.path.dirname(output_path), exist_ok=True)
             
-            with open(output_path, 'w', encoding='utf-8') as f:
-                json.dump(output, f, indent=2, ensure_ascii=False)
+            # orjson serializes the dataclasses directly, so no dict copy of
+            # the facility list is built
+            with open(output_path, 'wb') as f:
+                for facility in facilities:
+                    f.write(orjson.dumps(facility))
+                    f.write(b"\n")
+            
+            metadata_path = os.path.splitext(output_path)[0] + '.meta.json'
+            with open(metadata_path, 'wb') as f:
+                f.write(orjson.dumps(metadata, option=orjson.OPT_INDENT_2))
             
-            logger.info(f"Saved {len(facilities_data)} facilities to {output_path}")
+            logger.info(f"Saved {len(facilities)} facilities to {output_path}")
             
         except Exception as e:
             logger.error(f"Error saving results: {e}")
 
 def main():
     """Main execution function."""
-    output_path = "/Users/benweiss/Code/narr_extractor/03_raw_data/treatment_centers/inpatient/samhsa/samhsa_inpatient_facilities.json"
+    output_path = "/Users/benweiss/Code/narr_extractor/03_raw_data/treatment_centers/inpatient/samhsa/samhsa_inpatient_web_facilities.jsonl"
     
     extractor = SAMHSAWebExtractor()
     
@@ -512,7 +691,7 @@ def main():
         logger.info("Starting enhanced web extraction of hospital-based treatment facilities")
         
         # Extract from all states
-        facilities = extractor.extract_all_states()
+        facilities = asyncio.run(extractor.extract_all_states())
         
         # Save results
         extractor.save_results(facilities, output_path)
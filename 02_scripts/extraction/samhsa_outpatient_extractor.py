@@ -22,15 +22,21 @@ Author: Claude Code
 Date: 2025-07-31
 """
 
-import requests
-import json
-import time
+import asyncio
+import csv
+import ahocorasick
+import aiohttp
+from aiohttp_client_cache import CachedSession, SQLiteBackend
 import logging
-from typing import Dict, List, Optional, Any
-from dataclasses import dataclass, asdict
+import orjson
+from typing import AsyncIterator, BinaryIO, Dict, Iterable, List, Optional, Any, Set, Tuple
+from dataclasses import dataclass, field, fields
 from urllib.parse import urlencode
 import os
-from datetime import datetime
+import time
+from datetime import datetime, timedelta, timezone
+from types import MappingProxyType
+from email.utils import parsedate_to_datetime
 
 # Configure logging
 logging.basicConfig(
@@ -43,13 +49,13 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
-@dataclass
+@dataclass(slots=True)
 class TreatmentFacility:
     """Data structure for SAMHSA treatment facility information."""
     
     # Basic Information
     facility_name: str = ""
-    dba_names: List[str] = None
+    dba_names: List[str] = field(default_factory=list)
     facility_id: str = ""
     
     # Contact Information
@@ -70,17 +76,17 @@ class TreatmentFacility:
     longitude: float = 0.0
     
     # License and Certification Information
-    license_numbers: List[str] = None
-    certifications: List[str] = None
-    accreditations: List[str] = None
+    license_numbers: List[str] = field(default_factory=list)
+    certifications: List[str] = field(default_factory=list)
+    accreditations: List[str] = field(default_factory=list)
     
     # Service Information
-    service_types: List[str] = None
-    treatment_approaches: List[str] = None
-    treatment_modalities: List[str] = None
+    service_types: List[str] = field(default_factory=list)
+    treatment_approaches: List[str] = field(default_factory=list)
+    treatment_modalities: List[str] = field(default_factory=list)
     
     # Outpatient-Specific Services
-    outpatient_services: List[str] = None
+    outpatient_services: List[str] = field(default_factory=list)
     intensive_outpatient: bool = False
     partial_hospitalization: bool = False
     mat_services: bool = False
@@ -89,16 +95,16 @@ class TreatmentFacility:
     dui_dwi_programs: bool = False
     
     # Population and Demographics
-    age_groups_accepted: List[str] = None
-    special_populations: List[str] = None
-    gender_accepted: List[str] = None
+    age_groups_accepted: List[str] = field(default_factory=list)
+    special_populations: List[str] = field(default_factory=list)
+    gender_accepted: List[str] = field(default_factory=list)
     
     # Language Services
-    languages_spoken: List[str] = None
+    languages_spoken: List[str] = field(default_factory=list)
     
     # Payment and Insurance
-    insurance_accepted: List[str] = None
-    payment_options: List[str] = None
+    insurance_accepted: List[str] = field(default_factory=list)
+    payment_options: List[str] = field(default_factory=list)
     medicaid_accepted: bool = False
     medicare_accepted: bool = False
     private_insurance_accepted: bool = False
@@ -106,12 +112,12 @@ class TreatmentFacility:
     free_services: bool = False
     
     # Operational Information
-    hours_of_operation: Dict[str, str] = None
+    hours_of_operation: Dict[str, str] = field(default_factory=dict)
     appointment_required: bool = False
     walk_ins_accepted: bool = False
     
     # Staff Information
-    staff_credentials: List[str] = None
+    staff_credentials: List[str] = field(default_factory=list)
     medical_director: str = ""
     
     # Additional Metadata
@@ -123,41 +129,65 @@ class TreatmentFacility:
     extraction_date: str = ""
     
     def __post_init__(self):
-        """Initialize list fields if None."""
-        if self.dba_names is None:
-            self.dba_names = []
-        if self.license_numbers is None:
-            self.license_numbers = []
-        if self.certifications is None:
-            self.certifications = []
-        if self.accreditations is None:
-            self.accreditations = []
-        if self.service_types is None:
-            self.service_types = []
-        if self.treatment_approaches is None:
-            self.treatment_approaches = []
-        if self.treatment_modalities is None:
-            self.treatment_modalities = []
-        if self.outpatient_services is None:
-            self.outpatient_services = []
-        if self.age_groups_accepted is None:
-            self.age_groups_accepted = []
-        if self.special_populations is None:
-            self.special_populations = []
-        if self.gender_accepted is None:
-            self.gender_accepted = []
-        if self.languages_spoken is None:
-            self.languages_spoken = []
-        if self.insurance_accepted is None:
-            self.insurance_accepted = []
-        if self.payment_options is None:
-            self.payment_options = []
-        if self.hours_of_operation is None:
-            self.hours_of_operation = {}
-        if self.staff_credentials is None:
-            self.staff_credentials = []
-        if self.extraction_date == "":
+        """Stamp the extraction date when none was given."""
+        if not self.extraction_date:
             self.extraction_date = datetime.now().isoformat()
+    
+    def to_dict(self) -> Dict[str, Any]:
+        """Shallow field dict for serialization (no deepcopy, unlike asdict)."""
+        return {name: getattr(self, name) for name in FACILITY_FIELDS}
+
+FACILITY_FIELDS = tuple(field.name for field in fields(TreatmentFacility))
+
+# Read-only stand-in for a missing address/contact/location/insurance section
+EMPTY_SECTION = MappingProxyType({})
+
+def load_zip_centroids(path: str) -> List[str]:
+    """Read the ZIP codes to search around from the 'zip' column of a CSV file."""
+    with open(path, newline='', encoding='utf-8') as f:
+        return [row['zip'].strip().zfill(5) for row in csv.DictReader(f) if row.get('zip', '').strip()]
+
+# Responses worth retrying; anything else but 200 means the endpoint has no answer
+RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+
+def retry_after_seconds(value: Optional[str], default: float) -> float:
+    """Seconds to wait according to a Retry-After header (delta-seconds or HTTP date)."""
+    if not value:
+        return default
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        retry_at = parsedate_to_datetime(value)
+        return max(0.0, (retry_at - datetime.now(timezone.utc)).total_seconds())
+    except (TypeError, ValueError):
+        return default
+
+class RateLimiter:
+    """Token bucket bounding the aggregate request rate of concurrent tasks."""
+    
+    def __init__(self, rate: float, burst: int = 1):
+        self.rate = rate
+        self.burst = burst
+        self._tokens = float(burst)
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+    
+    async def acquire(self):
+        """Wait until another request may be sent."""
+        async with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            
+            if self._tokens < 1:
+                # Waiters queue on the lock, so tokens go out in arrival order
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+                self._tokens = 0.0
+                self._updated = time.monotonic()
+            else:
+                self._tokens -= 1
 
 class SAMHSAExtractor:
     """Main class for extracting SAMHSA treatment facility data."""
@@ -166,12 +196,40 @@ class SAMHSAExtractor:
         """Initialize the SAMHSA extractor."""
         self.base_url = "https://findtreatment.gov"
         self.api_base = f"{self.base_url}/api"
-        self.session = requests.Session()
-        self.session.headers.update({
+        
+        # One pooled session per run, opened by extract_all_states; at most
+        # max_concurrent_states states are queried at a time and the rate
+        # limiter spaces out the requests of all of them
+        self.session: Optional[aiohttp.ClientSession] = None
+        self.max_concurrent_states = 8
+        self.rate_limiter = RateLimiter(rate=5, burst=5)
+        self.max_retries = 3
+        self.retry_backoff = 0.5
+        self.headers = {
             'User-Agent': 'SAMHSA-Research-Bot/1.0',
             'Accept': 'application/json',
             'Content-Type': 'application/json'
-        })
+        }
+        
+        # Optional CSV of ZIP centroids ('zip' column); when set, each run
+        # searches zip_search_distance miles around every centroid instead of
+        # whole states, so large states are not cut off by per-query limits
+        self.zip_centroids_path: Optional[str] = None
+        self.zip_search_distance = 50
+        
+        # Successful responses are cached on disk (SQLite) for a day, so
+        # re-runs are served locally; set cache_name to None to always go to
+        # the network
+        self.cache_name: Optional[str] = 'samhsa_cache'
+        self.cache_expire_after = timedelta(days=1)
+        
+        # Ids of the facilities extracted so far in this run; overlapping
+        # searches (neighbouring ZIP radii, border facilities) return the
+        # same facility more than once
+        self._seen_ids: Set[str] = set()
+        
+        # API endpoint that last returned 200, tried first by later searches
+        self._working_endpoint: Optional[str] = None
         self.facilities = []
         self.extracted_count = 0
         
@@ -201,12 +259,107 @@ class SAMHSAExtractor:
             'individual_therapy',
             'family_therapy'
         ]
+        
+        # Outpatient program flags: TreatmentFacility field -> (label added to
+        # outpatient_services, service keywords that set it)
+        self.service_flag_terms = {
+            'intensive_outpatient': ('Intensive Outpatient Program (IOP)', ('intensive outpatient', 'iop')),
+            'partial_hospitalization': ('Partial Hospitalization Program (PHP)', ('partial hospitalization', 'php')),
+            'mat_services': ('Medication-Assisted Treatment (MAT)', ('medication assisted', 'mat')),
+            'opioid_treatment_program': ('Opioid Treatment Program (OTP)', ('opioid treatment', 'otp')),
+            'dui_dwi_programs': ('DUI/DWI Programs', ('dui', 'dwi'))
+        }
+        
+        # Service type identifiers as they appear in service text ('day_treatment'
+        # -> 'day treatment'); service strings get the same '_' -> ' ' treatment.
+        # Types containing another type ('outpatient counseling' contains
+        # 'outpatient') can never decide the filter and are left out.
+        service_type_words = {service_type.replace('_', ' ') for service_type in self.outpatient_service_types}
+        service_type_words = {
+            word for word in service_type_words
+            if not any(other != word and other in word for other in service_type_words)
+        }
+        
+        # One automaton for the outpatient service types and the flag
+        # keywords, so a service string is scanned once for all of them. Each
+        # word maps to (whether it is an outpatient service type, flag field or None).
+        flag_by_word = {word: flag for flag, (_, words) in self.service_flag_terms.items() for word in words}
+        self._service_automaton = ahocorasick.Automaton()
+        for word in service_type_words | set(flag_by_word):
+            self._service_automaton.add_word(word, (word in service_type_words, flag_by_word.get(word)))
+        self._service_automaton.make_automaton()
+    
+    def open_session(self) -> aiohttp.ClientSession:
+        """Create the pooled (and, with cache_name set, cached) HTTP session shared by all requests of a run."""
+        connector = aiohttp.TCPConnector(limit=16, ttl_dns_cache=300, keepalive_timeout=30)
+        timeout = aiohttp.ClientTimeout(total=30)
+        
+        if self.cache_name is None:
+            return aiohttp.ClientSession(connector=connector, headers=self.headers, timeout=timeout)
+        
+        cache = SQLiteBackend(self.cache_name, expire_after=self.cache_expire_after, allowed_codes=(200,))
+        return CachedSession(cache=cache, connector=connector, headers=self.headers, timeout=timeout)
+    
+    async def fetch(self, endpoint: str, params: Dict[str, Any]) -> Any:
+        """
+        GET an API endpoint.
+        
+        429 and 5xx responses and connection errors are retried up to
+        max_retries times with exponential backoff, waiting out a 429's
+        Retry-After; connection errors are raised once retries run out.
+        
+        Args:
+            endpoint: Endpoint URL
+            params: Query parameters
+            
+        Returns:
+            Decoded JSON body of a 200 response, or None for any other status
+            or a body that is not JSON
+        """
+        for attempt in range(self.max_retries + 1):
+            await self.rate_limiter.acquire()
+            status = None
+            retry_after = None
+            try:
+                async with self.session.get(endpoint, params=params) as response:
+                    if response.status == 200:
+                        # Decoded straight from bytes; an empty or non-JSON
+                        # body (e.g. an HTML app page) is no answer
+                        body = await response.read()
+                        if not body.strip():
+                            return None
+                        try:
+                            return orjson.loads(body)
+                        except ValueError:
+                            logger.warning(f"Non-JSON response from {endpoint}")
+                            return None
+                    if response.status not in RETRY_STATUSES:
+                        return None
+                    status = response.status
+                    retry_after = response.headers.get('Retry-After')
+            except (aiohttp.ClientError, asyncio.TimeoutError):
+                if attempt == self.max_retries:
+                    raise
+            
+            if attempt < self.max_retries:
+                wait_time = self.retry_backoff * 2 ** attempt
+                if status == 429:
+                    wait_time = retry_after_seconds(retry_after, default=wait_time)
+                logger.warning(f"HTTP {status or 'error'} for {endpoint}, retrying in {wait_time:.1f} seconds")
+                await asyncio.sleep(wait_time)
+        
+        return None
     
-    def get_facilities_by_location(self, 
-                                 state: str = None, 
-                                 city: str = None, 
-                                 zip_code: str = None,
-                                 distance: int = 50) -> List[Dict]:
+    def forget_endpoint(self, endpoint: str):
+        """Stop preferring endpoint once it fails."""
+        if self._working_endpoint == endpoint:
+            self._working_endpoint = None
+    
+    async def get_facilities_by_location(self, 
+                                         state: str = None, 
+                                         city: str = None, 
+                                         zip_code: str = None,
+                                         distance: int = 50) -> List[Dict]:
         """
         Extract facilities by geographic location.
         
@@ -239,15 +392,23 @@ class SAMHSAExtractor:
                 f"{self.api_base}/locator/search"
             ]
             
+            # The endpoint that answered last time goes first; the others are
+            # only probed if it stops answering
+            working_endpoint = self._working_endpoint
+            if working_endpoint:
+                endpoints.remove(working_endpoint)
+                endpoints.insert(0, working_endpoint)
+            
             facilities = []
             for endpoint in endpoints:
                 try:
                     logger.info(f"Trying endpoint: {endpoint}")
-                    response = self.session.get(endpoint, params=params, timeout=30)
+                    data = await self.fetch(endpoint, params)
                     
-                    if response.status_code == 200:
-                        data = response.json()
-                        logger.info(f"Success with endpoint: {endpoint}")
+                    if data is not None:
+                        if endpoint != working_endpoint:
+                            logger.info(f"Success with endpoint: {endpoint}")
+                        self._working_endpoint = endpoint
                         
                         # Handle different response structures
                         if 'facilities' in data:
@@ -260,9 +421,12 @@ class SAMHSAExtractor:
                             facilities = [data] if data else []
                             
                         break
+                    
+                    self.forget_endpoint(endpoint)
                         
-                except requests.exceptions.RequestException as e:
+                except (aiohttp.ClientError, asyncio.TimeoutError) as e:
                     logger.warning(f"Endpoint {endpoint} failed: {e}")
+                    self.forget_endpoint(endpoint)
                     continue
                     
             return facilities
@@ -271,29 +435,46 @@ class SAMHSAExtractor:
             logger.error(f"Error searching facilities for {state}: {e}")
             return []
     
-    def parse_facility_data(self, facility_data: Dict) -> TreatmentFacility:
+    def parse_facility_data(self, facility_data: Dict) -> Optional[TreatmentFacility]:
         """
-        Parse raw facility data into TreatmentFacility object.
+        Parse raw facility data into TreatmentFacility object if it offers outpatient services.
         
         Args:
             facility_data: Raw facility data dictionary
             
         Returns:
-            TreatmentFacility object
+            TreatmentFacility object, or None for a facility without outpatient services
         """
+        # One automaton pass over the services both filters for outpatient
+        # facilities and finds the program flags
+        services = facility_data.get('services')
+        service_str = ' '.join(services).lower().replace('_', ' ') if isinstance(services, list) else ''
+        
+        is_outpatient = False
+        matched_flags = set()
+        for _, (is_service_type, flag) in self._service_automaton.iter(service_str):
+            is_outpatient = is_outpatient or is_service_type
+            if flag:
+                matched_flags.add(flag)
+        
+        if not is_outpatient:
+            return None
+        
         facility = TreatmentFacility()
         
         try:
+            get = facility_data.get
+            
             # Basic Information
-            facility.facility_name = facility_data.get('name', '')
-            facility.facility_id = facility_data.get('id', '')
+            facility.facility_name = get('name', '')
+            facility.facility_id = get('id', '')
             
             # Handle DBA names
-            if 'dba' in facility_data:
-                facility.dba_names = [facility_data['dba']] if facility_data['dba'] else []
+            if dba := get('dba'):
+                facility.dba_names = [dba]
             
             # Address Information
-            address = facility_data.get('address', {})
+            address = get('address', EMPTY_SECTION)
             facility.address_line1 = address.get('street1', '')
             facility.address_line2 = address.get('street2', '')
             facility.city = address.get('city', '')
@@ -302,58 +483,39 @@ class SAMHSAExtractor:
             facility.county = address.get('county', '')
             
             # Contact Information
-            contact = facility_data.get('contact', {})
+            contact = get('contact', EMPTY_SECTION)
             facility.phone = contact.get('phone', '')
             facility.website = contact.get('website', '')
             facility.email = contact.get('email', '')
             
             # Geographic coordinates
-            location = facility_data.get('location', {})
+            location = get('location', EMPTY_SECTION)
             facility.latitude = float(location.get('lat', 0))
             facility.longitude = float(location.get('lng', 0))
             
             # Services Information
-            services = facility_data.get('services', [])
-            facility.service_types = services if isinstance(services, list) else []
-            
-            # Check for outpatient-specific services
-            facility.outpatient_services = []
-            service_str = ' '.join(facility.service_types).lower()
+            facility.service_types = services
             
-            if 'intensive outpatient' in service_str or 'iop' in service_str:
-                facility.intensive_outpatient = True
-                facility.outpatient_services.append('Intensive Outpatient Program (IOP)')
-                
-            if 'partial hospitalization' in service_str or 'php' in service_str:
-                facility.partial_hospitalization = True
-                facility.outpatient_services.append('Partial Hospitalization Program (PHP)')
-                
-            if 'medication assisted' in service_str or 'mat' in service_str:
-                facility.mat_services = True
-                facility.outpatient_services.append('Medication-Assisted Treatment (MAT)')
-                
-            if 'opioid treatment' in service_str or 'otp' in service_str:
-                facility.opioid_treatment_program = True
-                facility.outpatient_services.append('Opioid Treatment Program (OTP)')
-                
-            if 'dui' in service_str or 'dwi' in service_str:
-                facility.dui_dwi_programs = True
-                facility.outpatient_services.append('DUI/DWI Programs')
+            # Outpatient-specific services
+            for flag, (label, _) in self.service_flag_terms.items():
+                if flag in matched_flags:
+                    setattr(facility, flag, True)
+                    facility.outpatient_services.append(label)
             
             # Treatment approaches and modalities
-            facility.treatment_approaches = facility_data.get('treatment_approaches', [])
-            facility.treatment_modalities = facility_data.get('treatment_modalities', [])
+            facility.treatment_approaches = get('treatment_approaches', [])
+            facility.treatment_modalities = get('treatment_modalities', [])
             
             # Demographics and populations
-            facility.age_groups_accepted = facility_data.get('age_groups', [])
-            facility.special_populations = facility_data.get('special_populations', [])
-            facility.gender_accepted = facility_data.get('gender_accepted', [])
+            facility.age_groups_accepted = get('age_groups', [])
+            facility.special_populations = get('special_populations', [])
+            facility.gender_accepted = get('gender_accepted', [])
             
             # Languages
-            facility.languages_spoken = facility_data.get('languages', [])
+            facility.languages_spoken = get('languages', [])
             
             # Payment and insurance
-            insurance = facility_data.get('insurance', {})
+            insurance = get('insurance', EMPTY_SECTION)
             facility.medicaid_accepted = insurance.get('medicaid', False)
             facility.medicare_accepted = insurance.get('medicare', False)
             facility.private_insurance_accepted = insurance.get('private', False)
@@ -361,128 +523,278 @@ class SAMHSAExtractor:
             facility.free_services = insurance.get('free', False)
             
             # License and certification
-            facility.license_numbers = facility_data.get('licenses', [])
-            facility.certifications = facility_data.get('certifications', [])
-            facility.accreditations = facility_data.get('accreditations', [])
+            facility.license_numbers = get('licenses', [])
+            facility.certifications = get('certifications', [])
+            facility.accreditations = get('accreditations', [])
             
             # Operational information
-            facility.hours_of_operation = facility_data.get('hours', {})
-            facility.appointment_required = facility_data.get('appointment_required', False)
-            facility.walk_ins_accepted = facility_data.get('walk_ins_accepted', False)
+            facility.hours_of_operation = get('hours', {})
+            facility.appointment_required = get('appointment_required', False)
+            facility.walk_ins_accepted = get('walk_ins_accepted', False)
             
             # Facility type and ownership
-            facility.facility_type = facility_data.get('facility_type', '')
-            facility.ownership_type = facility_data.get('ownership_type', '')
-            facility.parent_organization = facility_data.get('parent_organization', '')
+            facility.facility_type = get('facility_type', '')
+            facility.ownership_type = get('ownership_type', '')
+            facility.parent_organization = get('parent_organization', '')
             
             # Metadata
-            facility.last_updated = facility_data.get('last_updated', '')
+            facility.last_updated = get('last_updated', '')
             
         except Exception as e:
             logger.error(f"Error parsing facility data: {e}")
             
         return facility
     
-    def extract_state_facilities(self, state: str) -> List[TreatmentFacility]:
+    async def extract_area_facilities(self, area: str, location: Dict[str, Any]) -> List[TreatmentFacility]:
         """
-        Extract all outpatient facilities for a specific state.
+        Extract all outpatient facilities of one search area.
         
         Args:
-            state: State abbreviation
+            area: Area name for logging (state abbreviation or ZIP code)
+            location: get_facilities_by_location arguments selecting the area
             
         Returns:
             List of TreatmentFacility objects
         """
-        logger.info(f"Extracting outpatient facilities for {state}")
+        logger.info(f"Extracting outpatient facilities for {area}")
         
         facilities = []
-        raw_facilities = self.get_facilities_by_location(state=state)
+        raw_facilities = await self.get_facilities_by_location(**location)
         
         for facility_data in raw_facilities:
-            # Filter for outpatient facilities only
-            services = facility_data.get('services', [])
-            service_str = ' '.join(services).lower() if services else ''
+            # Facilities already found by another search are skipped unparsed
+            facility_id = facility_data.get('id')
+            if facility_id and facility_id in self._seen_ids:
+                continue
             
-            # Check if facility offers outpatient services
-            is_outpatient = any(service in service_str for service in self.outpatient_service_types)
+            # Non-outpatient facilities parse to None
+            facility = self.parse_facility_data(facility_data)
             
-            if is_outpatient:
-                facility = self.parse_facility_data(facility_data)
+            if facility is not None:
+                if facility_id:
+                    self._seen_ids.add(facility_id)
                 facilities.append(facility)
                 self.extracted_count += 1
                 
                 if self.extracted_count % 100 == 0:
                     logger.info(f"Extracted {self.extracted_count} outpatient facilities")
         
-        logger.info(f"Extracted {len(facilities)} outpatient facilities from {state}")
+        logger.info(f"Extracted {len(facilities)} outpatient facilities from {area}")
         return facilities
     
-    def extract_all_states(self) -> List[TreatmentFacility]:
+    async def extract_state_facilities(self, state: str) -> List[TreatmentFacility]:
         """
-        Extract outpatient facilities from all US states.
+        Extract all outpatient facilities for a specific state.
         
+        Args:
+            state: State abbreviation
+            
         Returns:
-            List of all TreatmentFacility objects
+            List of TreatmentFacility objects
         """
-        logger.info("Starting comprehensive extraction of outpatient facilities from all states")
-        
-        all_facilities = []
+        return await self.extract_area_facilities(state, {'state': state})
+    
+    async def extract_area_in_slot(self, area: str, location: Dict[str, Any],
+                                   area_slots: asyncio.Semaphore) -> List[TreatmentFacility]:
+        """
+        Extract one search area while holding one of the concurrent area slots.
         
-        for state in self.us_states:
+        Args:
+            area: Area name for logging (state abbreviation or ZIP code)
+            location: get_facilities_by_location arguments selecting the area
+            area_slots: Semaphore bounding concurrently extracted areas
+            
+        Returns:
+            List of TreatmentFacility objects (empty if the area failed)
+        """
+        async with area_slots:
             try:
-                state_facilities = self.extract_state_facilities(state)
-                all_facilities.extend(state_facilities)
-                
-                # Rate limiting - pause between states
-                time.sleep(2)
+                return await self.extract_area_facilities(area, location)
                 
             except Exception as e:
-                logger.error(f"Error extracting facilities from {state}: {e}")
-                continue
+                logger.error(f"Error extracting facilities from {area}: {e}")
+                return []
+    
+    def search_areas(self) -> List[Tuple[str, Dict[str, Any]]]:
+        """
+        Search areas of a run: one per state, or one radius search per ZIP
+        centroid when zip_centroids_path is set.
         
-        logger.info(f"Total outpatient facilities extracted: {len(all_facilities)}")
-        return all_facilities
+        Returns:
+            List of (area name, get_facilities_by_location arguments) pairs
+        """
+        if not self.zip_centroids_path:
+            return [(state, {'state': state}) for state in self.us_states]
+        
+        return [
+            (zip_code, {'zip_code': zip_code, 'distance': self.zip_search_distance})
+            for zip_code in load_zip_centroids(self.zip_centroids_path)
+        ]
     
-    def save_to_json(self, facilities: List[TreatmentFacility], filepath: str):
+    async def extract_area_into(self, index: int, area: str, location: Dict[str, Any],
+                                area_slots: asyncio.Semaphore, queue: asyncio.Queue):
+        """Extract one search area and put (index, facilities) on queue."""
+        await queue.put((index, await self.extract_area_in_slot(area, location, area_slots)))
+    
+    async def extract_areas_into(self, queue: asyncio.Queue):
         """
-        Save facilities data to JSON file.
+        Extract all search areas, putting each area's (index, facilities) on
+        queue as soon as it is done and None after the last one.
         
         Args:
-            facilities: List of TreatmentFacility objects
-            filepath: Output file path
+            queue: Queue read by iter_area_results
         """
+        logger.info("Starting comprehensive extraction of outpatient facilities from all states")
+        
+        area_slots = asyncio.Semaphore(self.max_concurrent_states)
+        self._seen_ids.clear()
+        
         try:
-            # Convert facilities to dictionaries
-            facilities_data = []
-            for facility in facilities:
-                facility_dict = asdict(facility)
-                facilities_data.append(facility_dict)
-            
-            # Create output structure
-            output_data = {
-                "extraction_metadata": {
-                    "extraction_date": datetime.now().isoformat(),
-                    "total_facilities": len(facilities_data),
-                    "data_source": "SAMHSA Treatment Locator",
-                    "extraction_method": "API/Web Scraping",
-                    "service_types_targeted": self.outpatient_service_types,
-                    "geographic_coverage": "All US States and Territories"
-                },
-                "facilities": facilities_data
-            }
+            # Areas are queried concurrently over one session
+            async with self.open_session() as session:
+                self.session = session
+                try:
+                    await asyncio.gather(
+                        *(self.extract_area_into(index, area, location, area_slots, queue)
+                          for index, (area, location) in enumerate(self.search_areas()))
+                    )
+                finally:
+                    self.session = None
+            
+            logger.info(f"Total outpatient facilities extracted: {self.extracted_count}")
+            
+        finally:
+            await queue.put(None)
+    
+    async def iter_area_results(self) -> AsyncIterator[List[TreatmentFacility]]:
+        """
+        Yield the facilities of each search area, in area order, as soon as
+        that area and all areas before it are done.
+        
+        Yields:
+            List of TreatmentFacility objects of one area
+        """
+        queue: asyncio.Queue = asyncio.Queue()
+        producer = asyncio.create_task(self.extract_areas_into(queue))
+        
+        # Areas finishing early wait here until their predecessors are done
+        finished = {}
+        next_index = 0
+        try:
+            while (result := await queue.get()) is not None:
+                index, area_facilities = result
+                finished[index] = area_facilities
+                while next_index in finished:
+                    yield finished.pop(next_index)
+                    next_index += 1
             
+            await producer
+            
+        finally:
+            producer.cancel()
+    
+    async def extract_all_states(self) -> List[TreatmentFacility]:
+        """
+        Extract outpatient facilities from all US states.
+        
+        Returns:
+            List of all TreatmentFacility objects
+        """
+        return [
+            facility
+            async for area_facilities in self.iter_area_results()
+            for facility in area_facilities
+        ]
+    
+    def write_facility_lines(self, f: BinaryIO, facilities: Iterable[TreatmentFacility]) -> int:
+        """
+        Write facilities to an open binary file, one JSON object per line.
+        
+        Args:
+            f: Output file opened in binary mode
+            facilities: Iterable of TreatmentFacility objects
+            
+        Returns:
+            Number of facilities written
+        """
+        count = 0
+        for facility in facilities:
+            f.write(orjson.dumps(facility.to_dict()))
+            f.write(b"\n")
+            count += 1
+        return count
+    
+    def save_metadata(self, filepath: str, total_facilities: int):
+        """
+        Save the extraction metadata next to the facilities file, as .meta.json.
+        
+        Args:
+            filepath: Facilities output file path
+            total_facilities: Number of facilities in the file
+        """
+        metadata = {
+            "extraction_metadata": {
+                "extraction_date": datetime.now().isoformat(),
+                "total_facilities": total_facilities,
+                "data_source": "SAMHSA Treatment Locator",
+                "extraction_method": "API/Web Scraping",
+                "service_types_targeted": self.outpatient_service_types,
+                "geographic_coverage": "All US States and Territories"
+            }
+        }
+        
+        metadata_path = os.path.splitext(filepath)[0] + '.meta.json'
+        with open(metadata_path, 'wb') as f:
+            f.write(orjson.dumps(metadata, option=orjson.OPT_INDENT_2))
+    
+    def save_to_json(self, facilities: Iterable[TreatmentFacility], filepath: str):
+        """
+        Save facilities as JSON Lines, one facility per line.
+        
+        Facilities are written as they are iterated, so no list of facility
+        dicts is built. The extraction metadata goes to a sibling .meta.json file.
+        
+        Args:
+            facilities: Iterable of TreatmentFacility objects
+            filepath: Output file path
+        """
+        try:
             # Ensure directory exists
             os.makedirs(os.path.dirname(filepath), exist_ok=True)
             
-            # Save to file
-            with open(filepath, 'w', encoding='utf-8') as f:
-                json.dump(output_data, f, indent=2, ensure_ascii=False)
+            with open(filepath, 'wb') as f:
+                total_facilities = self.write_facility_lines(f, facilities)
+            
+            self.save_metadata(filepath, total_facilities)
             
-            logger.info(f"Saved {len(facilities_data)} facilities to {filepath}")
+            logger.info(f"Saved {total_facilities} facilities to {filepath}")
             
         except Exception as e:
             logger.error(f"Error saving data to {filepath}: {e}")
     
+    async def extract_to_json(self, filepath: str) -> int:
+        """
+        Extract all search areas, writing each area's facilities to filepath
+        as JSON Lines while later areas are still being fetched.
+        
+        Args:
+            filepath: Output file path
+            
+        Returns:
+            Number of facilities written
+        """
+        os.makedirs(os.path.dirname(filepath), exist_ok=True)
+        
+        total_facilities = 0
+        with open(filepath, 'wb') as f:
+            async for area_facilities in self.iter_area_results():
+                total_facilities += self.write_facility_lines(f, area_facilities)
+        
+        self.save_metadata(filepath, total_facilities)
+        
+        logger.info(f"Saved {total_facilities} facilities to {filepath}")
+        return total_facilities
+    
     def run_extraction(self, output_path: str = None) -> str:
         """
         Run the complete extraction process.
@@ -491,21 +803,18 @@ class SAMHSAExtractor:
             output_path: Optional custom output path
             
         Returns:
-            Path to the saved JSON file
+            Path to the saved JSON Lines file
         """
         if output_path is None:
-            output_path = "/Users/benweiss/Code/narr_extractor/03_raw_data/treatment_centers/outpatient/samhsa/samhsa_outpatient_facilities.json"
+            output_path = "/Users/benweiss/Code/narr_extractor/03_raw_data/treatment_centers/outpatient/samhsa/samhsa_outpatient_api_facilities.jsonl"
         
         logger.info("Starting SAMHSA outpatient treatment centers extraction")
         
         try:
-            # Extract facilities from all states
-            facilities = self.extract_all_states()
-            
-            # Save to JSON
-            self.save_to_json(facilities, output_path)
+            # Extract facilities from all states, saving each state's as it completes
+            total_facilities = asyncio.run(self.extract_to_json(output_path))
             
-            logger.info(f"Extraction completed successfully. Total facilities: {len(facilities)}")
+            logger.info(f"Extraction completed successfully. Total facilities: {total_facilities}")
             return output_path
             
         except Exception as e:
@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+"""Tests for the CSV reading, labels, levels of care and dedup of process_samhsa_csv."""
+
+import csv
+
+import pytest
+
+import process_samhsa_csv
+from process_samhsa_csv import (
+    INSURANCE_FLAGS, POPULATION_FLAGS, SERVICE_FLAGS, count_by_level_and_state,
+    determine_levels_of_care, expand_labels, flag_matrix, read_facility_csv
+)
+
+CSV_NAME = "FindTreament_Facility_listing_2025_07_31_190629.csv"
+
+COLUMNS = ['name1', 'name2', 'street1', 'street2', 'city', 'state', 'zip', 'website',
+           'hi', 'psyh', 'res', 'rd', 'sa', 'dt', 'otp', 'mh', 'gt', 'adlt', 'vet', 'mc', 'sf']
+
+# Rows written to the fixture CSV; flag columns left out are empty
+ROWS = [
+    # Any inpatient indicator wins over residential ones
+    {'name1': 'Mercy Hospital', 'street1': '1 Main St', 'city': 'Austin', 'state': 'TX',
+     'hi': '1', 'res': '1', 'sa': '1', 'dt': '1', 'adlt': '1', 'mc': '1'},
+    {'name1': 'Hillside House', 'name2': 'Unit B', 'street1': '2 Oak Ave', 'street2': 'Suite 4',
+     'city': 'Boston', 'state': 'MA', 'rd': '1', 'sa': '1', 'gt': '1', 'vet': '1', 'sf': '1',
+     'website': ' https://hillside.example '},
+    {'name1': 'Open Door Clinic', 'street1': '3 Elm St', 'city': 'Austin', 'state': 'TX',
+     'mh': '1', 'otp': '1', 'website': 'www.opendoor.example'},
+    # Same name/address/city as the row above, differing only in case
+    {'name1': 'OPEN DOOR CLINIC', 'street1': '3 ELM ST', 'city': 'austin', 'state': 'TX'},
+    # Non-ASCII case differences are duplicates too, as with str.lower
+    {'name1': 'Ünïcode Hôpital', 'street1': '4 Pine Rd', 'city': 'Zürich', 'state': 'AK', 'psyh': '1'},
+    {'name1': 'ÜNÏCODE HÔPITAL', 'street1': '4 PINE RD', 'city': 'ZÜRICH', 'state': 'AK'},
+    # Rows without a name or state are skipped, not counted as duplicates
+    {'name1': '', 'street1': '5 Birch Ln', 'city': 'Austin', 'state': 'TX'},
+    {'name1': 'No State Center', 'street1': '6 Cedar Ct', 'city': 'Austin', 'state': ''},
+]
+
+def write_csv(path, rows):
+    with open(path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.DictWriter(f, fieldnames=COLUMNS)
+        writer.writeheader()
+        writer.writerows(rows)
+
+@pytest.fixture
+def table(tmp_path):
+    csv_path = tmp_path / "facilities.csv"
+    write_csv(csv_path, ROWS)
+    return read_facility_csv(csv_path)
+
+@pytest.fixture
+def processed(tmp_path, monkeypatch):
+    """Run process_samhsa_csv on the fixture rows inside tmp_path."""
+    (tmp_path / "SAMHSA Directory").mkdir()
+    (tmp_path / "03_raw_data").mkdir()
+    write_csv(tmp_path / "SAMHSA Directory" / CSV_NAME, ROWS)
+    
+    # base_path is three levels above the script
+    monkeypatch.setattr(process_samhsa_csv, '__file__', str(tmp_path / "02_scripts" / "extraction" / "x.py"))
+    return process_samhsa_csv.process_samhsa_csv()
+
+def test_missing_columns_read_as_empty_strings(table):
+    assert table.num_rows == len(ROWS)
+    assert table.column('mm').to_pylist() == [''] * len(ROWS)
+    assert table.column('name2').to_pylist()[0] == ''
+
+def test_quoted_values_may_span_lines(tmp_path):
+    csv_path = tmp_path / "facilities.csv"
+    write_csv(csv_path, [{'name1': 'Two\nLines', 'state': 'TX'}, {'name1': 'Next', 'state': 'MA'}])
+    
+    assert read_facility_csv(csv_path).column('name1').to_pylist() == ['Two\nLines', 'Next']
+
+def test_levels_of_care(table):
+    assert determine_levels_of_care(table) == [
+        'inpatient', 'residential', 'outpatient', 'outpatient',
+        'inpatient', 'outpatient', 'outpatient', 'outpatient'
+    ]
+
+@pytest.mark.parametrize("flags, expected", [
+    (SERVICE_FLAGS, ['Substance Abuse Treatment', 'Detoxification', 'Residential Treatment', 'Hospital Inpatient']),
+    (POPULATION_FLAGS, ['Adults']),
+    (INSURANCE_FLAGS, ['Medicaid']),
+])
+def test_labels_follow_flag_order(table, flags, expected):
+    assert expand_labels(flag_matrix(table, flags), flags)[0] == expected
+
+def test_rows_without_flags_get_no_labels(table):
+    assert expand_labels(flag_matrix(table, SERVICE_FLAGS), SERVICE_FLAGS)[3] == []
+
+def test_count_by_level_and_state():
+    by_level, by_state = count_by_level_and_state(
+        ['outpatient', 'inpatient', 'outpatient', 'residential'], ['TX', 'MA', 'TX', 'AK']
+    )
+    
+    assert by_level == {'outpatient': 2, 'residential': 1, 'inpatient': 1}
+    # States come out sorted, not in first-seen order as the old loop built them
+    assert list(by_state) == ['AK', 'MA', 'TX']
+    assert by_state['TX'] == {'total': 2, 'outpatient': 2, 'residential': 0, 'inpatient': 0}
+    assert by_state['MA'] == {'total': 1, 'outpatient': 0, 'residential': 0, 'inpatient': 1}
+
+def test_dedup_and_statistics(processed):
+    stats = processed['statistics']
+    
+    assert stats['total_facilities'] == 4
+    assert stats['duplicates_found'] == 2
+    assert stats['by_level'] == {'outpatient': 1, 'residential': 1, 'inpatient': 2}
+    assert stats['by_state'] == {
+        'AK': {'total': 1, 'outpatient': 0, 'residential': 0, 'inpatient': 1},
+        'MA': {'total': 1, 'outpatient': 0, 'residential': 1, 'inpatient': 0},
+        'TX': {'total': 2, 'outpatient': 1, 'residential': 0, 'inpatient': 1},
+    }
+
+def test_facility_records(processed):
+    facilities = processed['facilities']
+    
+    # The first occurrence of each facility is kept, numbered in CSV order
+    assert [(f['id'], f['name']) for f in facilities] == [
+        ('SAMHSA_INP_000001', 'Mercy Hospital'),
+        ('SAMHSA_RES_000002', 'Hillside House - Unit B'),
+        ('SAMHSA_OUT_000003', 'Open Door Clinic'),
+        ('SAMHSA_INP_000004', 'Ünïcode Hôpital'),
+    ]
+    
+    hillside = facilities[1]
+    assert hillside['address']['street'] == '2 Oak Ave, Suite 4'
+    assert hillside['contact']['website'] == 'https://hillside.example'
+    assert hillside['services'] == ['Substance Abuse Treatment', 'Group Therapy']
+    assert hillside['populations_served'] == ['Veterans']
+    assert hillside['insurance_accepted'] == ['Sliding Fee Scale']
+    
+    # Websites that are not full URLs are dropped
+    assert facilities[2]['contact']['website'] == ''
+    assert facilities[2]['raw_data'] == {
+        'mh_services': True, 'sa_services': False, 'detox': False, 'methadone': False, 'otp': True
+    }
@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+"""Tests for the facility record layout and JSON/NDJSON output of samhsa_demo_extractor."""
+
+import json
+
+import orjson
+import pytest
+
+from samhsa_demo_extractor import (
+    FACILITY_FIELD_NAMES, OutpatientFacility, SAMHSADemoExtractor, ServiceFlag, dump_facility
+)
+
+# Facility record keys as written when each service was its own dataclass field
+BASELINE_FIELDS = [
+    'facility_name', 'facility_id', 'dba_names', 'address_line1', 'address_line2', 'city', 'state',
+    'zip_code', 'county', 'phone', 'fax', 'website', 'email', 'latitude', 'longitude',
+    'license_numbers', 'state_license', 'federal_certification', 'accreditations',
+    'standard_outpatient', 'intensive_outpatient', 'partial_hospitalization', 'day_treatment',
+    'medication_assisted_treatment', 'opioid_treatment_program', 'office_based_opioid_treatment',
+    'methadone_maintenance', 'buprenorphine_treatment', 'naltrexone_treatment',
+    'dui_dwi_programs', 'adolescent_programs', 'women_only_programs', 'men_only_programs',
+    'individual_therapy', 'group_therapy', 'family_therapy', 'cognitive_behavioral_therapy',
+    'dialectical_behavioral_therapy', 'motivational_interviewing', 'twelve_step_facilitation',
+    'serves_adolescents', 'serves_adults', 'serves_seniors', 'minimum_age', 'maximum_age',
+    'serves_pregnant_women', 'serves_criminal_justice', 'serves_military_veterans', 'serves_lgbtq',
+    'serves_deaf_hard_of_hearing', 'primary_language', 'additional_languages',
+    'interpreter_services', 'accepts_medicaid', 'accepts_medicare', 'accepts_private_insurance',
+    'accepts_cash_self_payment', 'sliding_fee_scale', 'free_services_available',
+    'payment_assistance_available', 'hours_of_operation', 'appointment_required',
+    'walk_ins_accepted', 'telehealth_services', 'total_staff_count', 'medical_director',
+    'licensed_physicians', 'licensed_counselors', 'social_workers', 'ownership_type',
+    'parent_organization', 'hospital_affiliated', 'outpatient_capacity',
+    'current_outpatient_census', 'waitlist_exists', 'average_wait_time_days',
+    'accreditation_status', 'last_inspection_date', 'quality_measures', 'data_source',
+    'survey_year', 'last_updated', 'extraction_date'
+]
+
+SERVICE_FIELDS = [flag.name.lower() for flag in ServiceFlag]
+
+@pytest.fixture(scope="module")
+def facilities():
+    extractor = SAMHSADemoExtractor(seed=7)
+    return extractor.filter_outpatient_only(extractor.create_comprehensive_sample_data(target_count=40))
+
+def test_field_names_match_baseline_record_keys():
+    assert list(FACILITY_FIELD_NAMES) == BASELINE_FIELDS
+
+def test_service_fields_are_the_baseline_bool_fields():
+    assert SERVICE_FIELDS == BASELINE_FIELDS[19:33]
+
+@pytest.mark.parametrize("flag", list(ServiceFlag))
+def test_service_flag_property_sets_and_clears_one_bit(flag):
+    facility = OutpatientFacility()
+    name = flag.name.lower()
+    
+    setattr(facility, name, True)
+    assert facility.service_flags == flag
+    assert [field for field in SERVICE_FIELDS if getattr(facility, field)] == [name]
+    
+    setattr(facility, name, False)
+    assert facility.service_flags == 0
+    assert getattr(facility, name) is False
+
+def test_service_flags_from_constructor():
+    facility = OutpatientFacility(
+        service_flags=ServiceFlag.INTENSIVE_OUTPATIENT | ServiceFlag.DUI_DWI_PROGRAMS
+    )
+    
+    assert facility.intensive_outpatient is True
+    assert facility.dui_dwi_programs is True
+    assert facility.standard_outpatient is False
+
+def test_dump_facility_writes_service_bools_not_the_bitmask():
+    facility = OutpatientFacility(facility_name="Test", hours_of_operation={"monday": "8-5"})
+    facility.medication_assisted_treatment = True
+    
+    record = orjson.loads(dump_facility(facility))
+    
+    assert list(record) == BASELINE_FIELDS
+    assert 'service_flags' not in record
+    assert {field: record[field] for field in SERVICE_FIELDS} == {
+        field: field == 'medication_assisted_treatment' for field in SERVICE_FIELDS
+    }
+    assert record['hours_of_operation'] == {"monday": "8-5"}
+
+def check_record(record, facility):
+    assert list(record) == BASELINE_FIELDS
+    for field in SERVICE_FIELDS:
+        assert record[field] is getattr(facility, field)
+    assert isinstance(record['outpatient_capacity'], int)
+    assert isinstance(record['latitude'], float)
+    assert isinstance(record['hours_of_operation'], dict)
+
+def test_json_output_keys(facilities, tmp_path):
+    filepath = tmp_path / "facilities.json"
+    SAMHSADemoExtractor(seed=7).save_to_json(facilities, str(filepath))
+    
+    with open(filepath) as f:
+        data = json.load(f)
+    
+    assert list(data) == ['extraction_metadata', 'data_statistics', 'field_definitions', 'facilities']
+    assert data['extraction_metadata']['total_facilities'] == len(facilities)
+    assert len(data['facilities']) == len(facilities)
+    for record, facility in zip(data['facilities'], facilities):
+        check_record(record, facility)
+
+def test_ndjson_output_keys(facilities, tmp_path):
+    filepath = tmp_path / "facilities.jsonl"
+    SAMHSADemoExtractor(seed=7).save_to_ndjson(facilities, str(filepath))
+    
+    with open(filepath) as f:
+        records = [json.loads(line) for line in f]
+    with open(tmp_path / "facilities.meta.json") as f:
+        metadata = json.load(f)
+    
+    assert len(records) == len(facilities)
+    for record, facility in zip(records, facilities):
+        check_record(record, facility)
+    assert list(metadata) == ['extraction_metadata', 'data_statistics', 'field_definitions']
@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+"""Tests for the streamed API response decoding of samhsa_inpatient_extractor."""
+
+import asyncio
+
+import orjson
+import pytest
+
+from samhsa_inpatient_extractor import stream_api_facilities
+
+class StreamedBody:
+    """Stands in for response.content, handing the body out in small reads."""
+    
+    def __init__(self, body: bytes, chunk_size: int = 7):
+        self.body = body
+        self.chunk_size = chunk_size
+    
+    async def read(self, n: int = -1) -> bytes:
+        size = self.chunk_size if n < 0 else min(n, self.chunk_size)
+        chunk, self.body = self.body[:size], self.body[size:]
+        return chunk
+
+class StreamedResponse:
+    def __init__(self, body: bytes):
+        self.content = StreamedBody(body)
+
+def stream(document) -> list:
+    body = document if isinstance(document, bytes) else orjson.dumps(document)
+    return asyncio.run(stream_api_facilities(StreamedResponse(body)))
+
+FACILITIES = [
+    {"id": "F-1", "name": "Mercy Hospital", "services": ["Hospital inpatient"], "item": {"nested": [1, 2]}},
+    {"id": "F-2", "name": "Valley Detox", "services": ["Detox"], "address": {"state": "CA"}},
+]
+
+@pytest.mark.parametrize("document", [
+    {"facilities": FACILITIES},
+    {"results": FACILITIES},
+    FACILITIES,
+], ids=["facilities", "results", "bare-list"])
+def test_known_response_shapes(document):
+    assert stream(document) == FACILITIES
+
+def test_facilities_take_precedence_over_results():
+    assert stream({"results": [{"id": "R-1"}], "facilities": FACILITIES}) == FACILITIES
+
+def test_results_take_precedence_over_a_bare_item_key():
+    assert stream({"item": [{"id": "X"}], "results": FACILITIES}) == FACILITIES
+
+@pytest.mark.parametrize("document", [
+    # Keys named "item" outside the known arrays are not facilities
+    {"item": {"id": "X"}},
+    {"data": {"item": {"id": "X"}}},
+    {"meta": {"item": [{"id": "X"}]}, "count": 0},
+    # 'facilities' must be an array to hold facilities
+    {"facilities": {"item": {"id": "X"}}},
+    {"facilities": []},
+])
+def test_values_outside_the_known_arrays_are_ignored(document):
+    assert stream(document) == []
+
+def test_other_keys_do_not_leak_into_facilities():
+    document = {"meta": {"item": {"id": "X"}}, "facilities": FACILITIES, "item": [{"id": "Y"}]}
+    
+    assert stream(document) == FACILITIES
+
+def test_empty_body_has_no_facilities():
+    assert stream(b"") == []
@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+"""Tests for the outpatient filter and program flags of samhsa_outpatient_extractor."""
+
+import pytest
+
+from samhsa_outpatient_extractor import SAMHSAExtractor
+
+@pytest.fixture(scope="module")
+def extractor():
+    return SAMHSAExtractor()
+
+def raw_facility(services):
+    return {"id": "F-1", "name": "Test Facility", "services": services}
+
+@pytest.mark.parametrize("services", [
+    ["Outpatient"],
+    ["Day treatment"],
+    ["group_therapy"],
+    ["Outpatient counseling"],
+    ["Family therapy", "Residential"],
+])
+def test_outpatient_service_types_are_kept(extractor, services):
+    facility = extractor.parse_facility_data(raw_facility(services))
+    
+    assert facility is not None
+    assert facility.facility_id == "F-1"
+    assert facility.service_types == services
+
+@pytest.mark.parametrize("services", [
+    ["Residential", "Detox"],
+    ["Hospital inpatient"],
+    [],
+    "Outpatient",  # not a list
+    None,
+])
+def test_facilities_without_outpatient_services_are_dropped(extractor, services):
+    assert extractor.parse_facility_data(raw_facility(services)) is None
+
+def test_service_type_without_program_sets_no_flags(extractor):
+    facility = extractor.parse_facility_data(raw_facility(["Day treatment", "Group therapy"]))
+    
+    assert facility.outpatient_services == []
+    assert not facility.intensive_outpatient
+    assert not facility.partial_hospitalization
+    assert not facility.mat_services
+    assert not facility.opioid_treatment_program
+    assert not facility.dui_dwi_programs
+
+def test_program_flags_and_labels(extractor):
+    facility = extractor.parse_facility_data(
+        raw_facility(["Medication Assisted Treatment", "intensive_outpatient", "DUI/DWI program"])
+    )
+    
+    assert facility.intensive_outpatient
+    assert facility.mat_services
+    assert facility.dui_dwi_programs
+    assert not facility.partial_hospitalization
+    assert not facility.opioid_treatment_program
+    assert facility.outpatient_services == [
+        'Intensive Outpatient Program (IOP)',
+        'Medication-Assisted Treatment (MAT)',
+        'DUI/DWI Programs'
+    ]
+
+def test_program_keyword_alone_is_not_outpatient(extractor):
+    # Flag keywords only label facilities that already passed the filter
+    assert extractor.parse_facility_data(raw_facility(["Detox", "OTP"])) is None